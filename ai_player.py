@@ -58,42 +58,39 @@ class AIPlayer:
         # Prendre une cible au hasard et regarder autour pour aplanir
         target_r, target_c = random.choice(targets)
         
-        # Chercher une case voisine qui peut être nivelée
-        best_diff = 100
-        best_corner = None
-        best_action = None # 'raise' or 'lower'
-        
-        for dr in range(-2, 3):
-            for dc in range(-2, 3):
-                r = target_r + dr
-                c = target_c + dc
-                if 0 <= r < self.game.game_map.grid_height and 0 <= c < self.game.game_map.grid_width:
-                    # Estimer le besoin d'aplanir. On veut idéalement aplanir selon la surface moyenne
-                    alt = self.game.game_map.get_corner_altitude(r, c)
-                    # Évaluer la platitude locale
-                    # Simplification: raise ou lower au hasard si on en a les moyens
-                    if random.random() < 0.5:
-                        cost = self.game.game_map.get_raise_cost(r, c)
-                        if cost > 0 and self.game.power_jauge[self.team] >= cost:
-                            best_corner = (r, c)
-                            best_action = 'raise'
-                            break
-                    else:
-                        cost = self.game.game_map.get_lower_cost(r, c)
-                        if cost > 0 and self.game.power_jauge[self.team] >= cost:
-                            best_corner = (r, c)
-                            best_action = 'lower'
-                            break
+        # Chercher l'édition utile la moins chère autour de la cible : monter les coins
+        # plus bas que la cible, baisser ceux plus hauts (aplanissement vers son altitude)
+        game_map = self.game.game_map
+        r0, r1 = max(0, target_r - 2), min(game_map.grid_height, target_r + 3)
+        c0, c1 = max(0, target_c - 2), min(game_map.grid_width, target_c + 3)
+        if r0 >= r1 or c0 >= c1:
+            return
+        target_alt = game_map.get_corner_altitude(target_r, target_c)
+        raise_costs, lower_costs = game_map.get_cost_field(r0, r1, c0, c1)
+        power = self.game.power_jauge[self.team]
 
-        if best_corner and best_action:
-            r, c = best_corner
-            cost = self.game.game_map.get_raise_cost(r, c) if best_action == 'raise' else self.game.game_map.get_lower_cost(r, c)
-            if self.game.power_jauge[self.team] >= cost:
-                self.game.power_jauge[self.team] -= cost
-                if best_action == 'raise':
-                    self.game.game_map.raise_corner(r, c)
+        best_cost = None
+        best_edit = None  # (r, c, 'raise' ou 'lower')
+        for r in range(r0, r1):
+            for c in range(c0, c1):
+                alt = game_map.get_corner_altitude(r, c)
+                if alt < target_alt:
+                    cost, action = raise_costs.item(r - r0, c - c0), 'raise'
+                elif alt > target_alt:
+                    cost, action = lower_costs.item(r - r0, c - c0), 'lower'
                 else:
-                    self.game.game_map.lower_corner(r, c)
+                    continue
+                if 0 < cost <= power and (best_cost is None or cost < best_cost):
+                    best_cost = cost
+                    best_edit = (r, c, action)
+
+        if best_edit is None:
+            return
+        r, c, action = best_edit
+        # Un seul plan calculé pour l'édition retenue, appliqué tel quel
+        plan = game_map.plan_raise(r, c) if action == 'raise' else game_map.plan_lower(r, c)
+        self.game.power_jauge[self.team] -= plan.cost
+        game_map.apply_plan(plan)
 
     def do_power_action(self):
         self.power_timer = 0.0
@@ -135,7 +132,10 @@ class AIPlayer:
                  if my_targets:
                      r, c = random.choice(my_targets)
                  else:
-                     r, c = (random.randint(5, 55), random.randint(5, 55))
+                     # Loin des bords (5..55 sur une carte de 64)
+                     game_map = self.game.game_map
+                     r = random.randint(5, max(5, game_map.grid_height - 9))
+                     c = random.randint(5, max(5, game_map.grid_width - 9))
              else:
                  r, c = random.choice(targets)
              
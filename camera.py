@@ -2,12 +2,16 @@ import pygame
 import settings
 
 class Camera:
-    def __init__(self):
+    def __init__(self, grid_width=settings.GRID_WIDTH, grid_height=settings.GRID_HEIGHT,
+                 view_size=settings.VIEW_SIZE):
         self.move_timer = 0.0
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.view_size = view_size
         # Position logique de la caméra en coordonnées de grille (r, c)
-        # Correspond au coin supérieur de la zone 8x8 affichée
-        self.r = float(settings.GRID_HEIGHT // 2 - 4)
-        self.c = float(settings.GRID_WIDTH // 2 - 4)
+        # Correspond au coin supérieur de la zone view_size x view_size affichée
+        self.r = float(grid_height // 2 - view_size // 2)
+        self.c = float(grid_width // 2 - view_size // 2)
 
     def move_direction(self, direction):
         # Déplace la caméra selon la direction
@@ -32,16 +36,16 @@ class Camera:
 
     def _clip(self):
         # Limites strictes basées sur la grille
-        max_r = float(settings.GRID_HEIGHT - 8)
-        max_c = float(settings.GRID_WIDTH - 8)
+        max_r = float(self.grid_height - self.view_size)
+        max_c = float(self.grid_width - self.view_size)
         self.r = max(0.0, min(self.r, max_r))
         self.c = max(0.0, min(self.c, max_c))
 
     def center_on(self, r, c):
         """Centre la caméra sur les coordonnées de grille r, c (entiers)."""
         # Utilisation de int() pour s'assurer que la caméra est centrée sur la case de la map
-        self.r = float(int(r) - 4)
-        self.c = float(int(c) - 4)
+        self.r = float(int(r) - self.view_size // 2)
+        self.c = float(int(c) - self.view_size // 2)
         self._clip()
 
     def update(self, dt):
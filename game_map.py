@@ -1,5 +1,9 @@
 import pygame
+import math
 import random
+from contextlib import contextmanager
+import numpy as np
+from render_batch import RenderBatch
 from settings import *
 
 
@@ -47,38 +51,520 @@ def load_tile_surfaces():
     return tiles
 
 
+# === Classification vectorisée des tiles terrain ===
+# Chaque tile terrain reçoit un identifiant compact (uint8) ; TERRAIN_TILE_KEYS[id] redonne la clé spritesheet.
+TERRAIN_TILE_KEYS = [TILE_FLAT, TILE_WATER, TILE_WATER_2, TILE_SWAMP,
+                     TILE_CONSTRUCTED_ALLIES, TILE_CONSTRUCTED_FOES]
+TERRAIN_TILE_KEYS += [key for key in SLOPE_TILES.values() if key not in TERRAIN_TILE_KEYS]
+TERRAIN_TILE_KEYS += [key for key in SLOPE_TILES_LOW.values() if key not in TERRAIN_TILE_KEYS]
+TERRAIN_TILE_IDS = {key: i for i, key in enumerate(TERRAIN_TILE_KEYS)}
+
+TILE_ID_FLAT = TERRAIN_TILE_IDS[TILE_FLAT]
+TILE_ID_WATER = TERRAIN_TILE_IDS[TILE_WATER]
+TILE_ID_WATER_2 = TERRAIN_TILE_IDS[TILE_WATER_2]
+TILE_ID_SWAMP = TERRAIN_TILE_IDS[TILE_SWAMP]
+TILE_ID_CONSTRUCTED_ALLIES = TERRAIN_TILE_IDS[TILE_CONSTRUCTED_ALLIES]
+TILE_ID_CONSTRUCTED_FOES = TERRAIN_TILE_IDS[TILE_CONSTRUCTED_FOES]
+
+
+def _build_slope_lut():
+    """Table de 32 entrées : bits 0-3 = deltas (NW, NE, SE, SW) > min, bit 4 = altitude min à 0."""
+    lut = np.empty(32, dtype=np.uint8)
+    for packed in range(32):
+        d = tuple((packed >> bit) & 1 for bit in range(4))
+        low = packed >> 4
+        if low and d == (0, 0, 0, 0):
+            key = TILE_WATER  # Les 4 coins à 0
+        else:
+            key = (SLOPE_TILES_LOW if low else SLOPE_TILES).get(d, TILE_FLAT)
+        lut[packed] = TERRAIN_TILE_IDS[key]
+    return lut
+
+
+SLOPE_LUT = _build_slope_lut()
+# Sprites de rochers ; la couche rock_layer stocke leur indice + 1 (0 = pas de rocher)
+ROCK_TILE_KEYS = [(5, 2), (5, 3), (5, 4)]
+
+WATER_CODE = 1 << 4  # Code de pente d'une tile dont les 4 coins sont à 0
+
+# Tiles dessinées un demi-losange plus bas que leur coin NW (voir GameMap.draw_tile)
+RAISED_TILE_KEYS = (TILE_FLAT, TILE_CONSTRUCTED_ALLIES, TILE_CONSTRUCTED_FOES, TILE_SWAMP)
+
+
+def compose_column(tile_surfaces, tile_key, n_copies):
+    """
+    Tile posée sur n_copies copies empilées de TILE_FLAT (sa face latérale jusqu'au niveau 0),
+    composée en une seule surface de hauteur TILE_HEIGHT + n_copies * TILE_HALF_H, tile en haut.
+    """
+    tile_surf = tile_surfaces.get(tile_key)
+    flat_surf = tile_surfaces.get(TILE_FLAT)
+    if tile_surf is None or flat_surf is None or n_copies <= 0:
+        return tile_surf
+    width, height = tile_surf.get_size()
+    column = pygame.Surface((width, height + n_copies * TILE_HALF_H), pygame.SRCALPHA)
+    for k in range(n_copies, 0, -1):  # du bas vers le haut
+        column.blit(flat_surf, (0, k * TILE_HALF_H))
+    column.blit(tile_surf, (0, 0))
+    return column
+
+
+def build_column_surfaces(tile_surfaces):
+    """Colonnes de chaque tile de terrain pour 0..ALTITUDE_MAX copies, indexées par (clé, copies)."""
+    return {(key, n_copies): compose_column(tile_surfaces, key, n_copies)
+            for key in TERRAIN_TILE_KEYS for n_copies in range(ALTITUDE_MAX + 1)}
+
+
+# Rayon (Chebyshev) autour d'un coin modifié dans lequel les coûts raise/lower peuvent changer :
+# une propagation descend (ou monte) d'au plus un niveau par pas, puis lit les voisins du dernier coin.
+COST_RADIUS = ALTITUDE_MAX - ALTITUDE_MIN + 1
+
+# Décalages des 8 voisins d'un coin
+NEIGHBORS_8 = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def pack_slope_codes(corners):
+    """Code de pente (0..31) de chaque tile d'un bloc de coins (h+1, w+1) -> (h, w)."""
+    a0 = corners[:-1, :-1]
+    a1 = corners[:-1, 1:]
+    a2 = corners[1:, 1:]
+    a3 = corners[1:, :-1]
+    min_alt = np.minimum(np.minimum(a0, a1), np.minimum(a2, a3))
+    packed = (a0 > min_alt).astype(np.uint8)
+    packed |= (a1 > min_alt).astype(np.uint8) << 1
+    packed |= (a2 > min_alt).astype(np.uint8) << 2
+    packed |= (a3 > min_alt).astype(np.uint8) << 3
+    packed |= (min_alt == 0).astype(np.uint8) << 4
+    return packed
+
+
+def _relax_from_row(row, prev):
+    """row[c] <= prev[c-1..c+1] + 1 (voisins de la ligne déjà balayée)."""
+    np.minimum(row, prev + 1, out=row)
+    np.minimum(row[1:], prev[:-1] + 1, out=row[1:])
+    np.minimum(row[:-1], prev[1:] + 1, out=row[:-1])
+
+
+def chebyshev_envelope(values):
+    """
+    Plus grande grille <= `values` dont les voisins (8 directions) diffèrent d'au plus 1,
+    c.-à-d. min sur q de values[q] + distance de Chebyshev(p, q).
+    Chanfrein en deux balayages (avant puis arrière), chaque ligne étant vectorisée :
+    O(N), au lieu de répéter des passes complètes jusqu'à stabilité.
+    """
+    out = np.array(values, dtype=np.int32)
+    height, width = out.shape
+    idx = np.arange(width, dtype=np.int32)
+    rev_idx = idx[::-1]
+    for r in range(height):
+        row = out[r]
+        if r > 0:
+            _relax_from_row(row, out[r - 1])
+        # Voisin de gauche propagé sur toute la ligne : v[c] = min_k<=c (v[k] + c - k)
+        row[:] = np.minimum.accumulate(row - idx) + idx
+    for r in range(height - 1, -1, -1):
+        row = out[r]
+        if r < height - 1:
+            _relax_from_row(row, out[r + 1])
+        # Voisin de droite, même principe de droite à gauche
+        row[:] = np.minimum.accumulate((row - rev_idx)[::-1])[::-1] + rev_idx
+    return out
+
+
+# Équipe propriétaire d'une tuile dans la grille de territoire
+TERRITORY_NONE = 0
+TERRITORY_ALLIES = 1
+TERRITORY_FOES = 2
+
+def label_components(mask, diagonal=True):
+    """
+    Composantes connexes d'une grille booléenne (8-connexité si `diagonal`, sinon 4).
+    Union-find sur les segments de chaque ligne plutôt que case par case.
+    Renvoie (labels int32, 0 = hors masque, 1..n), n.
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    end_cols = np.nonzero(edges == -1)[1]
+    parent = []
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    runs = []  # (ligne, début, fin exclue, segment)
+    prev, current, row = [], [], -1
+    reach = 1 if diagonal else 0
+    for r, start, end in zip(start_rows.tolist(), start_cols.tolist(), end_cols.tolist()):
+        if r != row:
+            prev = current if r == row + 1 else []
+            current, row = [], r
+        run = len(parent)
+        parent.append(run)
+        for p_start, p_end, p_run in prev:
+            if p_start < end + reach and p_end + reach > start:
+                a, b = find(p_run), find(run)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+        current.append((start, end, run))
+        runs.append((r, start, end, run))
+
+    labels = np.zeros((height, width), dtype=np.int32)
+    ids = {}
+    for r, start, end, run in runs:
+        root = find(run)
+        if root not in ids:
+            ids[root] = len(ids) + 1
+        labels[r, start:end] = ids[root]
+    return labels, len(ids)
+
+
+# Zones d'influence (5x5 centrées) : château = carré complet sans le centre (24 tuiles),
+# autres bâtiments = motif spécifique de 16 tuiles
+CASTLE_INFLUENCE_MASK = (
+    (1, 1, 1, 1, 1),
+    (1, 1, 1, 1, 1),
+    (1, 1, 0, 1, 1),
+    (1, 1, 1, 1, 1),
+    (1, 1, 1, 1, 1),
+)
+HOUSE_INFLUENCE_MASK = (
+    (1, 0, 1, 0, 1),
+    (0, 1, 1, 1, 0),
+    (1, 1, 0, 1, 1),
+    (0, 1, 1, 1, 0),
+    (1, 0, 1, 0, 1),
+)
+# Mêmes masques en motifs de bits par ligne (bit k = colonne c + k - 2), indexés par is_castle
+INFLUENCE_BITS = {
+    is_castle: [sum(bit << k for k, bit in enumerate(row)) for row in mask]
+    for is_castle, mask in ((True, CASTLE_INFLUENCE_MASK), (False, HOUSE_INFLUENCE_MASK))
+}
+
+
+def _masked_sums(padded, mask):
+    """Somme, pour chaque centre, des cases de `padded` (bordure de 2) retenues par le masque 5x5."""
+    height, width = padded.shape[0] - 4, padded.shape[1] - 4
+    total = np.zeros((height, width), dtype=np.int16)
+    for dr in range(5):
+        for dc in range(5):
+            if mask[dr][dc]:
+                total += padded[dr:dr + height, dc:dc + width]
+    return total
+
+
+# Côté (en tuiles) des chunks : les caches dérivés sont invalidés et recalculés par chunk
+CHUNK_SIZE = 32
+
+
+def chunk_any(mask, size=CHUNK_SIZE):
+    """Réduit une grille booléenne de tuiles en grille de chunks (vrai si une tuile l'est)."""
+    height, width = mask.shape
+    rows, cols = -(-height // size), -(-width // size)
+    padded = np.zeros((rows * size, cols * size), dtype=bool)
+    padded[:height, :width] = mask
+    return padded.reshape(rows, size, cols, size).any(axis=(1, 3))
+
+
+# Jusqu'à ce nombre de coins modifiés (un clic, un pas de terraformation...), les tuiles
+# voisines sont parcourues en Python : moins cher que les tableaux numpy de _corner_tiles
+SMALL_EDIT_CORNERS = 32
+
+
+def _corner_tile_set(corners, height, width):
+    """Ensemble des tuiles autour d'une courte liste de coins (4 par coin), bornées à la grille."""
+    return {(tr, tc) for r, c in corners for tr in (r - 1, r) for tc in (c - 1, c)
+            if 0 <= tr < height and 0 <= tc < width}
+
+
+def _corner_tiles(corners, height, width):
+    """Tuiles (lignes, colonnes) autour d'une liste de coins (4 par coin), bornées à la grille."""
+    rows = np.fromiter((p[0] for p in corners), dtype=np.intp, count=len(corners))
+    cols = np.fromiter((p[1] for p in corners), dtype=np.intp, count=len(corners))
+    tr = np.concatenate((rows - 1, rows - 1, rows, rows))
+    tc = np.concatenate((cols - 1, cols, cols - 1, cols))
+    inside = (tr >= 0) & (tr < height) & (tc >= 0) & (tc < width)
+    return tr[inside], tc[inside]
+
+
+def _dirty_runs(flags):
+    """Suites (ligne, c0, c1) de chunks vrais consécutifs sur chaque ligne de la grille de chunks."""
+    runs = []
+    rows, cols = np.nonzero(flags)
+    for cr, cc in zip(rows.tolist(), cols.tolist()):
+        if runs and runs[-1][0] == cr and runs[-1][2] == cc:
+            runs[-1][2] = cc + 1
+        else:
+            runs.append([cr, cc, cc + 1])
+    return runs
+
+
+def _influence_window(row_bits, c):
+    """Aligne les bits des colonnes c-2..c+2 d'une ligne sur les bits 0..4."""
+    if c >= 2:
+        return row_bits >> (c - 2)
+    return row_bits << (2 - c)
+
+
+class TerrainEvent:
+    """
+    Changement de terrain publié par GameMap (voir GameMap.subscribe).
+    `rect` = (r0, r1, c0, c1) : bloc de tuiles touché ; `added` / `removed` : tuiles
+    ajoutées ou retirées (rochers, marécages) ; `version` : terrain_version après le changement
+    (inchangée par un événement TERRITORY).
+    """
+    HEIGHTS = 'heights'
+    ROCKS = 'rocks'
+    SWAMPS = 'swamps'
+    TERRITORY = 'territory'
+
+    def __init__(self, kind, rect, version, added=(), removed=()):
+        self.kind = kind
+        self.rect = rect
+        self.version = version
+        self.added = added
+        self.removed = removed
+
+
+class TerrainPlan:
+    """Résultat d'une simulation de raise/lower : coins à modifier et leur nouvelle altitude."""
+
+    def __init__(self, seeds, delta, changes, version):
+        self.seeds = list(seeds)
+        self.delta = delta
+        self.changes = changes  # { (r, c): nouvelle altitude }
+        self.version = version  # terrain_version au moment du calcul
+
+    @property
+    def cost(self):
+        return len(self.changes)
+
+
 class GameMap:
-    def __init__(self, grid_width, grid_height):
+    def __init__(self, grid_width, grid_height, view_size=VIEW_SIZE):
         self.grid_width = grid_width
         self.grid_height = grid_height
-        self.corners = [
-            [0 for _ in range(grid_width + 1)]
-            for _ in range(grid_height + 1)
-        ]
+        self.view_size = view_size
+        # Champ de hauteur compact : un int8 par coin (0..ALTITUDE_MAX)
+        self.corners = np.zeros((grid_height + 1, grid_width + 1), dtype=np.int8)
         self.houses = []
-        self.rocks = {}  # { (r, c): tile_key }
-        self.swamps = set() # { (r, c) }
+        # Couches alignées sur la grille des tuiles : rochers (indice dans ROCK_TILE_KEYS + 1,
+        # 0 = aucun) et marécages. L'eau se déduit des coins (voir water_mask).
+        self.rock_layer = np.zeros((grid_height, grid_width), dtype=np.uint8)
+        self.swamp_layer = np.zeros((grid_height, grid_width), dtype=bool)
+        # Positions de départ des peeps par équipe (cartes générées, voir generate)
+        self.start_positions = {}
         self.tile_surfaces = load_tile_surfaces()
+        # Tiles de terrain déjà posées sur leur face latérale : un seul blit par tuile
+        self.column_surfaces = build_column_surfaces(self.tile_surfaces)
         self.water_timer = 0.0
         self.water_frame = 0
         self.flag_frame = 0
+        # Cache persistant des identifiants de tiles (eau toujours en frame 0, voir get_tile_key)
+        self._tile_ids = np.zeros((grid_height, grid_width), dtype=np.uint8)
+        # Tiles plates et hors d'eau, puis plates, sèches, sans rocher ni marécage (« constructibles »).
+        # Les constructibles sont aussi gardées en bits (un int Python par ligne, bit c = colonne c)
+        # pour compter les zones d'influence par popcount.
+        self._flat = np.zeros((grid_height, grid_width), dtype=bool)
+        self._buildable = np.zeros((grid_height, grid_width), dtype=bool)
+        self._buildable_rows = [0] * grid_height
+        # Territoire : maisons qui revendiquent chaque tuile (ordre de self.houses), et équipe
+        # de la première d'entre elles (TERRITORY_*) pour la classification vectorisée
+        self._claims = {}  # { (r, c): [house, ...] }
+        self._territory = np.zeros((grid_height, grid_width), dtype=np.int8)
+        self._house_seq = {}  # { house: rang d'ajout } (ordre de self.houses)
+        self._next_house_seq = 0
+        # Index des sites de construction (voir can_place_house_initial / best_site_near).
+        # Nombre de bâtiments vivants à distance de Chebyshev < 2 et < 4, et de châteaux à < 4.
+        self._near2 = np.zeros((grid_height, grid_width), dtype=np.int16)
+        self._near4 = np.zeros((grid_height, grid_width), dtype=np.int16)
+        self._castle_near4 = np.zeros((grid_height, grid_width), dtype=np.int16)
+        self._indexed_houses = {}  # { house: est un château } pour les bâtiments comptés
+        self._house_scores = np.full((grid_height, grid_width), -1, dtype=np.int8)
+        self._castle_scores = np.full((grid_height, grid_width), -1, dtype=np.int8)
+        self._house_sites = np.zeros((grid_height, grid_width), dtype=bool)
+        self._castle_sites = np.zeros((grid_height, grid_width), dtype=bool)
+        # Chunks de CHUNK_SIZE x CHUNK_SIZE tuiles à reclasser (tiles) et à réindexer (sites)
+        self.chunk_rows = -(-grid_height // CHUNK_SIZE)
+        self.chunk_cols = -(-grid_width // CHUNK_SIZE)
+        self._tile_dirty = np.ones((self.chunk_rows, self.chunk_cols), dtype=bool)
+        self._site_dirty = np.ones((self.chunk_rows, self.chunk_cols), dtype=bool)
+        # Composantes connexes : terres (cases où un peep peut marcher, 8-connexes) et étendues
+        # d'eau (tuiles submergées, 4-connexes). Étiquetées par chunk (identifiants uniques par
+        # chunk) puis fusionnées le long des bords de chunks (voir _refresh_labels).
+        self._label_dirty = np.ones((self.chunk_rows, self.chunk_cols), dtype=bool)
+        self._land_local = np.zeros((grid_height, grid_width), dtype=np.int32)
+        self._water_local = np.zeros((grid_height, grid_width), dtype=np.int32)
+        label_count = self.chunk_rows * self.chunk_cols * CHUNK_SIZE * CHUNK_SIZE + 1
+        self._land_counts = np.zeros(label_count, dtype=np.int32)  # cases par étiquette locale
+        self._water_counts = np.zeros(label_count, dtype=np.int32)
+        self._land_roots = self._land_sizes = None
+        self._water_roots = self._water_sizes = None
+        # Incrémenté à chaque écriture d'altitude (invalide les TerrainPlan en attente)
+        self.terrain_version = 0
+        # Champs de coût raise/lower par coin, calculés à la demande (-1 = à recalculer)
+        self._raise_cost = np.full((grid_height + 1, grid_width + 1), -1, dtype=np.int16)
+        self._lower_cost = np.full((grid_height + 1, grid_width + 1), -1, dtype=np.int16)
+        self._costs_cached = False  # au moins un coût calculé depuis la dernière remise à -1
+        # Abonnés aux TerrainEvent (voir subscribe)
+        self._subscribers = []
+        # Transaction terrain (voir batch) : coins modifiés en attente de nettoyage
+        self._batch_depth = 0
+        self._pending_corners = []
+        # Coins dont les tiles voisines doivent être vérifiées pour les rochers (None = toute la carte)
+        self._drown_corners = []
+
+    def _mark_chunks(self, r0, r1, c0, c1, *flags):
+        """Marque dans chaque grille de `flags` les chunks qui recouvrent le bloc de tuiles [r0:r1, c0:c1]."""
+        r0, r1 = max(0, r0), min(self.grid_height, r1)
+        c0, c1 = max(0, c0), min(self.grid_width, c1)
+        if r0 < r1 and c0 < c1:
+            cr0, cr1 = r0 // CHUNK_SIZE, (r1 - 1) // CHUNK_SIZE
+            cc0, cc1 = c0 // CHUNK_SIZE, (c1 - 1) // CHUNK_SIZE
+            if cr0 == cr1 and cc0 == cc1:
+                # Cas courant d'une petite édition : un seul chunk, sans tranche numpy
+                for grid in flags:
+                    grid[cr0, cc0] = True
+            else:
+                for grid in flags:
+                    grid[cr0:cr1 + 1, cc0:cc1 + 1] = True
+
+    def _mark_tiles_dirty(self, r0, r1, c0, c1):
+        """Invalide le bloc de tiles [r0:r1, c0:c1] du cache de classification."""
+        self._mark_chunks(r0, r1, c0, c1, self._tile_dirty)
+        # Un site dépend des tuiles constructibles dans un rayon de 2 (zone d'influence 5x5)
+        self._mark_sites_dirty(r0 - 2, r1 + 2, c0 - 2, c1 + 2)
+
+    def _mark_sites_dirty(self, r0, r1, c0, c1):
+        self._mark_chunks(r0, r1, c0, c1, self._site_dirty)
+
+    def _heights_changed(self, r0, r1, c0, c1):
+        """Altitudes modifiées sur le bloc de tuiles [r0:r1, c0:c1] (coins [r0:r1 + 1, c0:c1 + 1])."""
+        # Classification et étiquettes d'eau : mêmes chunks, marqués en une fois
+        self._mark_chunks(r0, r1, c0, c1, self._tile_dirty, self._label_dirty)
+        self._mark_sites_dirty(r0 - 2, r1 + 2, c0 - 2, c1 + 2)
+        self._invalidate_costs(r0, r1 + 1, c0, c1 + 1)
+        self._publish(TerrainEvent.HEIGHTS, r0, r1, c0, c1)
+
+    def _mark_tile_list_dirty(self, tiles):
+        if tiles:
+            rows = [t[0] for t in tiles]
+            cols = [t[1] for t in tiles]
+            self._mark_tiles_dirty(min(rows), max(rows) + 1, min(cols), max(cols) + 1)
+
+    def _mark_all_dirty(self):
+        self._tile_dirty.fill(True)
+        self._site_dirty.fill(True)
+
+    def iter_chunks(self, r0=0, r1=None, c0=0, c1=None):
+        """Blocs de tuiles (r0, r1, c0, c1) des chunks qui recouvrent [r0:r1, c0:c1], bornés à ce bloc."""
+        r1 = self.grid_height if r1 is None else r1
+        c1 = self.grid_width if c1 is None else c1
+        for cr in range(max(0, r0) // CHUNK_SIZE, self.chunk_rows):
+            br0, br1 = cr * CHUNK_SIZE, min(self.grid_height, (cr + 1) * CHUNK_SIZE)
+            if br0 >= r1:
+                break
+            for cc in range(max(0, c0) // CHUNK_SIZE, self.chunk_cols):
+                bc0, bc1 = cc * CHUNK_SIZE, min(self.grid_width, (cc + 1) * CHUNK_SIZE)
+                if bc0 >= c1:
+                    break
+                yield max(br0, r0), min(br1, r1), max(bc0, c0), min(bc1, c1)
+
+    def _take_dirty_blocks(self, flags):
+        """
+        Vide `flags` (grille de chunks) et renvoie les blocs de tuiles à recalculer :
+        les chunks sales consécutifs d'une même ligne de chunks sont fusionnés.
+        """
+        blocks = []
+        for cr, cc0, cc1 in _dirty_runs(flags):
+            blocks.append((cr * CHUNK_SIZE, min(self.grid_height, (cr + 1) * CHUNK_SIZE),
+                           cc0 * CHUNK_SIZE, min(self.grid_width, cc1 * CHUNK_SIZE)))
+        flags.fill(False)
+        return blocks
+
+    def subscribe(self, callback):
+        """Appelle callback(event) pour chaque TerrainEvent publié."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _publish(self, kind, r0, r1, c0, c1, added=(), removed=()):
+        r0, r1 = max(0, r0), min(self.grid_height, r1)
+        c0, c1 = max(0, c0), min(self.grid_width, c1)
+        if r0 >= r1 or c0 >= c1:
+            return
+        if kind != TerrainEvent.TERRITORY:
+            # Le territoire ne touche ni aux altitudes ni au relief : TerrainPlan en attente
+            # et caches indexés par version restent valides
+            self.terrain_version += 1
+        if self._subscribers:
+            event = TerrainEvent(kind, (r0, r1, c0, c1), self.terrain_version, added, removed)
+            for callback in list(self._subscribers):
+                callback(event)
+
+    def _publish_tiles(self, kind, added=(), removed=()):
+        tiles = list(added) + list(removed)
+        if tiles:
+            rows = [t[0] for t in tiles]
+            cols = [t[1] for t in tiles]
+            self._publish(kind, min(rows), max(rows) + 1, min(cols), max(cols) + 1, added, removed)
+
+    def _heights_rewritten(self):
+        """À appeler après une réécriture globale des coins (flood, lissage, génération...)."""
+        self._mark_all_dirty()
+        self._label_dirty.fill(True)
+        self._raise_cost.fill(-1)
+        self._lower_cost.fill(-1)
+        self._costs_cached = False
+        self._publish(TerrainEvent.HEIGHTS, 0, self.grid_height, 0, self.grid_width)
+
+    def _invalidate_costs(self, r0, r1, c0, c1):
+        """Invalide les coûts de tous les coins dont la propagation peut lire les coins [r0:r1, c0:c1]."""
+        if not self._costs_cached:
+            # Rien à invalider tant qu'aucun coût n'a été demandé (le jeu n'en calcule pas)
+            return
+        r0, r1 = max(0, r0 - COST_RADIUS), r1 + COST_RADIUS
+        c0, c1 = max(0, c0 - COST_RADIUS), c1 + COST_RADIUS
+        self._raise_cost[r0:r1, c0:c1] = -1
+        self._lower_cost[r0:r1, c0:c1] = -1
+
+    def _refresh_tiles(self):
+        """Reclasse uniquement les chunks invalidés depuis le dernier appel."""
+        self._flush_corner_changes()
+        if not self._tile_dirty.any():
+            return
+        for r0, r1, c0, c1 in self._take_dirty_blocks(self._tile_dirty):
+            codes = pack_slope_codes(self.corners[r0:r1 + 1, c0:c1 + 1])
+            self._tile_ids[r0:r1, c0:c1] = self._classify_block(r0, r1, c0, c1, codes)
+            self._refresh_buildable(r0, r1, c0, c1, codes == 0)
+
+    def _refresh_buildable(self, r0, r1, c0, c1, flat):
+        self._flat[r0:r1, c0:c1] = flat
+        self._buildable[r0:r1, c0:c1] = (flat & (self.rock_layer[r0:r1, c0:c1] == 0)
+                                         & ~self.swamp_layer[r0:r1, c0:c1])
+        packed = np.packbits(self._buildable[r0:r1], axis=1, bitorder='little')
+        for r, row in enumerate(packed, r0):
+            self._buildable_rows[r] = int.from_bytes(row.tobytes(), 'little')
 
     def get_corner_altitude(self, r, c):
         if 0 <= r <= self.grid_height and 0 <= c <= self.grid_width:
-            return self.corners[r][c]
+            # item() renvoie un int Python (pas de débordement int8 dans les calculs appelants)
+            return self.corners.item(r, c)
         return -1
 
     def set_corner_altitude(self, r, c, value):
         if 0 <= r <= self.grid_height and 0 <= c <= self.grid_width:
             clamped = max(ALTITUDE_MIN, min(value, ALTITUDE_MAX))
-            if self.corners[r][c] != clamped:
-                self.corners[r][c] = clamped
-                # Le terrain a changé, les marécages adjacents disparaissent
-                for dr in [-1, 0]:
-                    for dc in [-1, 0]:
-                        nr, nc = r + dr, c + dc
-                        if (nr, nc) in self.swamps:
-                            self.swamps.remove((nr, nc))
+            if self.corners.item(r, c) != clamped:
+                self.corners[r, c] = clamped
+                self.terrain_version += 1
+                self._corners_changed([(r, c)])
                 return True
         return False
 
@@ -91,100 +577,261 @@ class GameMap:
         return int(sx), int(sy)
 
     def screen_to_nearest_corner(self, sx, sy, cam_r=0, cam_c=0):
-        best_r, best_c = 0, 0
-        min_dist = float("inf")
+        """
+        Coin le plus proche du point écran (sx, sy), parmi les coins de la vue élargie
+        (2 de marge avant, 4 après). Distance : (sx - px)² + (2 * (sy - py - TILE_HALF_H))²,
+        égalités départagées par (r, c) croissants.
+        Inversion isométrique : en u = c - r, v = c + r, un coin d'altitude a est visé en
+        u ≈ U et v - a ≈ V ; on ne mesure que les coins compatibles avec la meilleure
+        distance connue, au lieu de toute la vue.
+        """
         start_r = max(0, int(cam_r) - 2)
-        end_r = min(self.grid_height + 1, int(cam_r) + 12)
+        end_r = min(self.grid_height + 1, int(cam_r) + self.view_size + 4)
         start_c = max(0, int(cam_c) - 2)
-        end_c = min(self.grid_width + 1, int(cam_c) + 12)
-        
-        for r in range(start_r, end_r):
-            for c in range(start_c, end_c):
-                alt = self.get_corner_altitude(r, c)
-                px, py = self.world_to_screen(r, c, alt, cam_r, cam_c)
-                
-                # Le centre de gravité visuel de l'intersection de la grille isométrique
-                # est décalé vers le bas de TILE_HALF_H (8 pixels) par rapport au top
-                target_y = py + TILE_HALF_H
-                
-                # Prendre en compte le ratio isométrique (2:1) pour la forme de la zone de clic
-                d = (sx - px) ** 2 + ((sy - target_y) * 2) ** 2
-                
-                if d < min_dist:
-                    min_dist = d
-                    best_r, best_c = r, c
-        return best_r, best_c
-
-    def propagate_raise(self, r, c, visited=None):
-        if visited is None:
-            visited = set()
-        if (r, c) in visited:
-            return
-        visited.add((r, c))
-        current = self.get_corner_altitude(r, c)
-        new_alt = current + 1
-        if not self.set_corner_altitude(r, c, new_alt):
-            return
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
+        end_c = min(self.grid_width + 1, int(cam_c) + self.view_size + 4)
+        if start_r >= end_r or start_c >= end_c:
+            return 0, 0
+
+        U = (sx - MAP_OFFSET_X) / TILE_HALF_W + (cam_c - cam_r)
+        V = (sy - MAP_OFFSET_Y - TILE_HALF_H) / TILE_HALF_H + (cam_c + cam_r)
+
+        def distance(r, c):
+            px, py = self.world_to_screen(r, c, self.corners.item(r, c), cam_r, cam_c)
+            return (sx - px) ** 2 + ((sy - py - TILE_HALF_H) * 2) ** 2
+
+        # Candidats de départ : le coin visé pour chaque altitude possible, ramené dans la vue
+        best = None
+        for alt in range(ALTITUDE_MIN, ALTITUDE_MAX + 1):
+            u, v = round(U), round(V + alt)
+            r = min(end_r - 1, max(start_r, (v - u) // 2))
+            c = min(end_c - 1, max(start_c, (v + u) // 2))
+            key = (distance(r, c), r, c)
+            if best is None or key < best:
+                best = key
+
+        # Seuls les coins dont la borne inférieure de distance ne dépasse pas la meilleure
+        # peuvent gagner (marge de 2 pixels pour les arrondis de world_to_screen)
+        reach = best[0] ** 0.5 + 2
+        u_lo = max(math.ceil(U - reach / TILE_HALF_W), start_c - (end_r - 1))
+        u_hi = min(math.floor(U + reach / TILE_HALF_W), (end_c - 1) - start_r)
+        v_lo = max(math.ceil(V + ALTITUDE_MIN - reach / (2 * TILE_HALF_H)), start_r + start_c)
+        v_hi = min(math.floor(V + ALTITUDE_MAX + reach / (2 * TILE_HALF_H)), end_r + end_c - 2)
+        for u in range(u_lo, u_hi + 1):
+            for v in range(v_lo + (v_lo + u) % 2, v_hi + 1, 2):
+                r, c = (v - u) // 2, (v + u) // 2
+                if start_r <= r < end_r and start_c <= c < end_c:
+                    key = (distance(r, c), r, c)
+                    if key < best:
+                        best = key
+        return best[1], best[2]
+
+    def propagate_raise(self, r, c):
+        return self.propagate_corners([(r, c)], 1)
+
+    def propagate_lower(self, r, c):
+        return self.propagate_corners([(r, c)], -1)
+
+    def propagate_corners(self, seeds, delta):
+        """
+        Monte (delta=1) ou baisse (delta=-1) d'un niveau les coins `seeds` puis
+        propage aux voisins pour conserver l'écart max de 1.
+        Renvoie la liste des coins modifiés.
+        """
+        return self._write_plan(self.plan_corners(seeds, delta))
+
+    def plan_corners(self, seeds, delta):
+        """
+        Simule propagate_corners sans toucher à la carte : les altitudes provisoires
+        sont gardées dans un dictionnaire creux { (r, c): nouvelle altitude }.
+        Pile explicite (pas de récursion) : supporte les grandes cartes.
+        """
+        altitude = self.corners.item
+        max_r, max_c = self.grid_height, self.grid_width
+        limit = ALTITUDE_MAX if delta > 0 else ALTITUDE_MIN
+        visited = set()
+        changes = {}
+        stack = list(seeds)
+        while stack:
+            corner = stack.pop()
+            if corner in visited:
+                continue
+            visited.add(corner)
+            r, c = corner
+            if not (0 <= r <= max_r and 0 <= c <= max_c):
+                continue
+            # Un coin non visité n'a pas encore de valeur provisoire : lecture directe
+            old_alt = altitude(r, c)
+            if old_alt == limit:
+                continue
+            new_alt = old_alt + delta
+            changes[corner] = new_alt
+            for dr, dc in NEIGHBORS_8:
                 nr, nc = r + dr, c + dc
-                if 0 <= nr <= self.grid_height and 0 <= nc <= self.grid_width:
-                    if new_alt - self.get_corner_altitude(nr, nc) > 1:
-                        self.propagate_raise(nr, nc, visited)
-
-    def propagate_lower(self, r, c, visited=None):
-        if visited is None:
-            visited = set()
-        if (r, c) in visited:
-            return
-        visited.add((r, c))
-        current = self.get_corner_altitude(r, c)
-        new_alt = current - 1
-        if not self.set_corner_altitude(r, c, new_alt):
+                if 0 <= nr <= max_r and 0 <= nc <= max_c and (new_alt - altitude(nr, nc)) * delta > 1:
+                    if (nr, nc) not in visited:
+                        stack.append((nr, nc))
+        return TerrainPlan(seeds, delta, changes, self.terrain_version)
+
+    def plan_raise(self, r, c):
+        return self.plan_corners([(r, c)], 1)
+
+    def plan_lower(self, r, c):
+        return self.plan_corners([(r, c)], -1)
+
+    def apply_plan(self, plan):
+        """
+        Applique un plan obtenu par plan_raise/plan_lower. S'il a été calculé sur
+        un terrain qui a changé depuis, il est recalculé. Renvoie les coins modifiés.
+        """
+        changed = self._write_plan(plan)
+        self.update_rocks_water(changed)
+        return changed
+
+    def _write_plan(self, plan):
+        if plan.version != self.terrain_version:
+            plan = self.plan_corners(plan.seeds, plan.delta)
+        corners = self.corners
+        for (r, c), alt in plan.changes.items():
+            corners[r, c] = alt
+        changed = list(plan.changes)
+        if changed:
+            self.terrain_version += 1
+        self._corners_changed(changed)
+        return changed
+
+    def _corners_changed(self, changed):
+        """Enregistre des coins modifiés ; le nettoyage est immédiat hors transaction (voir batch)."""
+        self._pending_corners.extend(changed)
+        if not self._batch_depth:
+            self._flush_corner_changes()
+
+    def _flush_corner_changes(self):
+        """Effets de bord des écritures de coins en attente : marécages détruits, caches invalidés."""
+        changed = self._pending_corners
+        if not changed:
             return
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                nr, nc = r + dr, c + dc
-                if 0 <= nr <= self.grid_height and 0 <= nc <= self.grid_width:
-                    if self.get_corner_altitude(nr, nc) - new_alt > 1:
-                        self.propagate_lower(nr, nc, visited)
+        self._pending_corners = []
+        # Le terrain a changé : les marécages des tiles touchées disparaissent
+        if len(changed) <= SMALL_EDIT_CORNERS:
+            swamp = self.swamp_layer.item
+            drained = sorted(t for t in _corner_tile_set(changed, self.grid_height, self.grid_width)
+                             if swamp(*t))
+            for tile in drained:
+                self.swamp_layer[tile] = False
+        else:
+            tr, tc = _corner_tiles(changed, self.grid_height, self.grid_width)
+            hit = self.swamp_layer[tr, tc]
+            drained = sorted(set(zip(tr[hit].tolist(), tc[hit].tolist())))
+            self.swamp_layer[tr[hit], tc[hit]] = False
+        rows = [p[0] for p in changed]
+        cols = [p[1] for p in changed]
+        self._heights_changed(min(rows) - 1, max(rows) + 1, min(cols) - 1, max(cols) + 1)
+        if drained:
+            self._publish_tiles(TerrainEvent.SWAMPS, removed=drained)
 
     def raise_corner(self, r, c):
-        self.propagate_raise(r, c)
-        self.update_rocks_water()
+        changed = self.propagate_raise(r, c)
+        self.update_rocks_water(changed)
+        return changed
 
     def lower_corner(self, r, c):
-        self.propagate_lower(r, c)
-        self.update_rocks_water()
+        changed = self.propagate_lower(r, c)
+        self.update_rocks_water(changed)
+        return changed
+
+    def raise_corners(self, seeds):
+        """Monte plusieurs coins en une seule propagation."""
+        changed = self.propagate_corners(seeds, 1)
+        self.update_rocks_water(changed)
+        return changed
+
+    def lower_corners(self, seeds):
+        """Baisse plusieurs coins en une seule propagation."""
+        changed = self.propagate_corners(seeds, -1)
+        self.update_rocks_water(changed)
+        return changed
+
+    def apply_brush(self, seeds, deltas):
+        """
+        Pinceau multi-graines : chaque coin de `seeds` monte ou baisse de la valeur
+        correspondante de `deltas` (entier quelconque, cumulé si un coin est répété),
+        en une seule propagation. Les baisses sont appliquées d'abord, puis les montées.
+        Le résultat est le cône de Chebyshev autour des cibles (même terrain que des
+        raise_corner/lower_corner répétés sur une graine unique), calculé sur la boîte
+        des graines élargie de COST_RADIUS : au-delà, aucun coin ne peut changer.
+        Renvoie la zone modifiée (r0, r1, c0, c1), bornes hautes exclues, ou None.
+        """
+        max_r, max_c = self.grid_height, self.grid_width
+        totals = {}
+        for (r, c), delta in zip(seeds, deltas):
+            if 0 <= r <= max_r and 0 <= c <= max_c:
+                totals[(r, c)] = totals.get((r, c), 0) + delta
+        totals = {rc: delta for rc, delta in totals.items() if delta}
+        if not totals:
+            return None
+        rows = [rc[0] for rc in totals]
+        cols = [rc[1] for rc in totals]
+        r0, r1 = max(0, min(rows) - COST_RADIUS), min(max_r + 1, max(rows) + COST_RADIUS + 1)
+        c0, c1 = max(0, min(cols) - COST_RADIUS), min(max_c + 1, max(cols) + COST_RADIUS + 1)
+        block = self.corners[r0:r1, c0:c1]
+        heights = block.astype(np.int32)
+        # Valeur neutre pour les coins sans graine : le cône qui en part ne mord jamais
+        neutral = ALTITUDE_MAX + COST_RADIUS
+        for sign in (-1, 1):
+            targets = np.full(heights.shape, neutral, dtype=np.int32)
+            for (r, c), delta in totals.items():
+                if delta * sign > 0:
+                    alt = min(max(heights[r - r0, c - c0] + delta, ALTITUDE_MIN), ALTITUDE_MAX)
+                    # Montée : cône inversé (max de alt - distance = -min de -alt + distance)
+                    targets[r - r0, c - c0] = alt if sign < 0 else -alt
+            if (targets == neutral).all():
+                continue
+            cone = chebyshev_envelope(targets)
+            if sign < 0:
+                np.minimum(heights, cone, out=heights)
+            else:
+                np.maximum(heights, -cone, out=heights)
+        local = np.argwhere(heights != block)
+        if not len(local):
+            return None
+        block[...] = heights
+        changed = [(r0 + lr, c0 + lc) for lr, lc in local.tolist()]
+        self.terrain_version += 1
+        self._corners_changed(changed)
+        self.update_rocks_water(changed)
+        lo, hi = local.min(axis=0), local.max(axis=0)
+        return r0 + int(lo[0]), r0 + int(hi[0]) + 1, c0 + int(lo[1]), c0 + int(hi[1]) + 1
 
     def do_flood(self):
         """Baisse l'altitude de TOUS les coins de la carte de 1 niveau."""
-        for r in range(self.grid_height + 1):
-            for c in range(self.grid_width + 1):
-                self.corners[r][c] = max(ALTITUDE_MIN, self.corners[r][c] - 1)
+        # Un coin au-dessus de 0 n'appartient qu'à des tuiles émergées : seuls les chunks
+        # qui en contiennent changent, les chunks entièrement sous l'eau restent en cache.
+        land = chunk_any(~self.water_mask())
+        np.subtract(self.corners, 1, out=self.corners)
+        np.maximum(self.corners, ALTITUDE_MIN, out=self.corners)
+        for cr, cc0, cc1 in _dirty_runs(land):
+            r0, r1 = cr * CHUNK_SIZE, (cr + 1) * CHUNK_SIZE
+            c0, c1 = cc0 * CHUNK_SIZE, cc1 * CHUNK_SIZE
+            self._heights_changed(r0, r1, c0, c1)
         self.update_rocks_water()
 
     def do_quake(self, center_r, center_c):
         """Effectue les dégâts physiques du tremblement de terre : baisse 20-30 cases et en monte 0-10 au hasard."""
+        seeds, deltas = [], []
         # Abaissement (20-30 cases)
         lower_count = random.randint(20, 30)
         for _ in range(lower_count):
-            rr = center_r + random.randint(-4, 3)
-            rc = center_c + random.randint(-4, 3)
-            self.lower_corner(rr, rc)
-        
+            seeds.append((center_r + random.randint(-4, 3), center_c + random.randint(-4, 3)))
+            deltas.append(-1)
+
         # Élévation (0-10 cases)
         raise_count = random.randint(0, 10)
         for _ in range(raise_count):
-            rr = center_r + random.randint(-4, 3)
-            rc = center_c + random.randint(-4, 3)
-            self.raise_corner(rr, rc)
-            
-        self.update_rocks_water()
+            seeds.append((center_r + random.randint(-4, 3), center_c + random.randint(-4, 3)))
+            deltas.append(1)
+
+        # Un seul coup de pinceau pour toute la secousse
+        self.apply_brush(seeds, deltas)
 
     def do_swamp(self, center_r, center_c):
         """Ajoute 20-30 cases swamp sur la map 12x12 centrée."""
@@ -201,44 +848,206 @@ class GameMap:
                 c = self.get_corner_altitude(rr + 1, rc + 1)
                 d = self.get_corner_altitude(rr + 1, rc)
                 if a == b == c == d and a > 0:
-                    self.swamps.add((rr, rc))
+                    self.add_swamp(rr, rc)
+
+    def is_swamp(self, r, c):
+        return 0 <= r < self.grid_height and 0 <= c < self.grid_width and self.swamp_layer.item(r, c)
+
+    def add_swamp(self, r, c):
+        self.swamp_layer[r, c] = True
+        self._mark_tiles_dirty(r, r + 1, c, c + 1)
+        self._publish_tiles(TerrainEvent.SWAMPS, added=[(r, c)])
+
+    def clear_swamps(self):
+        removed = [tuple(rc) for rc in np.argwhere(self.swamp_layer).tolist()]
+        self._mark_tile_list_dirty(removed)
+        self.swamp_layer.fill(False)
+        self._publish_tiles(TerrainEvent.SWAMPS, removed=removed)
         
-    def update_rocks_water(self):
-        """Vérifie tous les rochers existants et les supprime si la case est submergée."""
-        to_remove = []
-        for (r, c) in self.rocks.keys():
-            if self.is_water(r, c):
-                to_remove.append((r, c))
-        for rc in to_remove:
-            del self.rocks[rc]
+    @contextmanager
+    def batch(self):
+        """
+        Transaction terrain : `with game_map.batch(): ...` regroupe plusieurs éditions.
+        Le nettoyage des marécages, la noyade des rochers et l'invalidation des caches
+        sont faits une seule fois à la sortie, sur l'union des coins modifiés.
+        Les transactions peuvent s'imbriquer ; seule la plus externe valide.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._flush_corner_changes()
+                if self._drown_corners is None or self._drown_corners:
+                    self._drown_rocks()
+
+    def update_rocks_water(self, changed=None):
+        """
+        Supprime les rochers dont la case est submergée. Si `changed` (coins modifiés)
+        est fourni, seules les 4 tiles autour de chacun de ces coins sont vérifiées.
+        """
+        if changed is None:
+            self._drown_corners = None
+        elif self._drown_corners is not None:
+            self._drown_corners.extend(changed)
+        if self._batch_depth:
+            # Reporté à la fin de la transaction
+            return
+        self._drown_rocks()
+
+    def _drown_rocks(self):
+        corners = self._drown_corners
+        self._drown_corners = []
+        if corners is None:
+            drowned = np.nonzero((self.rock_layer != 0) & self.water_mask())
+            to_remove = list(zip(drowned[0].tolist(), drowned[1].tolist()))
+        elif len(corners) <= SMALL_EDIT_CORNERS:
+            # Le plus souvent aucun rocher autour : la reclassification n'est faite que s'il y en a
+            rock = self.rock_layer.item
+            to_remove = [t for t in _corner_tile_set(corners, self.grid_height, self.grid_width) if rock(*t)]
+            if to_remove:
+                self._refresh_tiles()
+                to_remove = sorted(t for t in to_remove if self._tile_ids.item(*t) == TILE_ID_WATER)
+        else:
+            # Seules les tuiles autour des coins modifiés : coût proportionnel à la taille de l'édition
+            self._refresh_tiles()
+            tr, tc = _corner_tiles(corners, self.grid_height, self.grid_width)
+            hit = (self.rock_layer[tr, tc] != 0) & (self._tile_ids[tr, tc] == TILE_ID_WATER)
+            to_remove = sorted(set(zip(tr[hit].tolist(), tc[hit].tolist())))
+        if not to_remove:
+            return
+        rows, cols = zip(*to_remove)
+        self.rock_layer[list(rows), list(cols)] = 0
+        self._mark_tile_list_dirty(to_remove)
+        self._publish_tiles(TerrainEvent.ROCKS, removed=to_remove)
             
     def is_water(self, r, c):
+        if 0 <= r < self.grid_height and 0 <= c < self.grid_width:
+            self._refresh_tiles()
+            return self._tile_ids.item(r, c) == TILE_ID_WATER
         return self.get_tile_key(r, c) in (TILE_WATER, TILE_WATER_2)
 
+    def water_mask(self):
+        """Grille booléenne (h, w) des tiles submergées (les 4 coins à 0)."""
+        self._refresh_tiles()
+        return self._tile_ids == TILE_ID_WATER
+
+    def _refresh_labels(self):
+        """Réétiquette les chunks modifiés puis refait la fusion le long des bords de chunks."""
+        self._refresh_tiles()
+        if not self._label_dirty.any():
+            return
+        cells = CHUNK_SIZE * CHUNK_SIZE
+        for cr, cc in np.argwhere(self._label_dirty).tolist():
+            r0, r1 = cr * CHUNK_SIZE, min(self.grid_height, (cr + 1) * CHUNK_SIZE)
+            c0, c1 = cc * CHUNK_SIZE, min(self.grid_width, (cc + 1) * CHUNK_SIZE)
+            base = (cr * self.chunk_cols + cc) * cells
+            for local, counts, mask, diagonal in (
+                (self._land_local, self._land_counts, self.corners[r0:r1, c0:c1] > 0, True),
+                (self._water_local, self._water_counts, self._tile_ids[r0:r1, c0:c1] == TILE_ID_WATER, False),
+            ):
+                labels, n = label_components(mask, diagonal)
+                local[r0:r1, c0:c1] = np.where(labels > 0, labels + base, 0)
+                counts[base + 1:base + cells + 1] = 0
+                counts[base + 1:base + n + 1] = np.bincount(labels.ravel(), minlength=n + 1)[1:]
+        self._label_dirty.fill(False)
+        self._land_roots, self._land_sizes = self._merge_chunk_labels(self._land_local, self._land_counts, True)
+        self._water_roots, self._water_sizes = self._merge_chunk_labels(self._water_local, self._water_counts, False)
+
+    def _merge_chunk_labels(self, local, counts, diagonal):
+        """
+        Relie les étiquettes de chunks voisins qui se touchent (union-find sur les paires de bord).
+        Renvoie (racine de chaque étiquette, taille de chaque composante indexée par sa racine).
+        """
+        borders = [(local[:, cc * CHUNK_SIZE - 1], local[:, cc * CHUNK_SIZE]) for cc in range(1, self.chunk_cols)]
+        borders += [(local[cr * CHUNK_SIZE - 1], local[cr * CHUNK_SIZE]) for cr in range(1, self.chunk_rows)]
+        firsts, seconds = [], []
+        for a, b in borders:
+            pairs = [(a, b), (a[:-1], b[1:]), (a[1:], b[:-1])] if diagonal else [(a, b)]
+            for x, y in pairs:
+                firsts.append(x)
+                seconds.append(y)
+
+        roots = np.arange(len(counts), dtype=np.int32)
+        sizes = counts.astype(np.int64)
+        if firsts:
+            a, b = np.concatenate(firsts).astype(np.int64), np.concatenate(seconds).astype(np.int64)
+            keep = (a > 0) & (b > 0)
+            pairs = np.unique(a[keep] * len(counts) + b[keep])
+            parent = {}
+
+            def find(i):
+                root = i
+                while parent.get(root, root) != root:
+                    root = parent[root]
+                while i != root:
+                    parent[i], i = root, parent[i]
+                return root
+
+            for x, y in zip((pairs // len(counts)).tolist(), (pairs % len(counts)).tolist()):
+                x, y = find(x), find(y)
+                if x != y:
+                    parent[max(x, y)] = min(x, y)
+            if parent:
+                # Étiquettes rattachées à une autre : leur taille passe à leur racine
+                labels = list(parent)
+                roots[labels] = [find(i) for i in labels]
+                np.add.at(sizes, roots[labels], counts[labels])
+                sizes[labels] = 0
+        return roots, sizes
+
+    def landmass_id(self, r, c):
+        """Identifiant de la terre (cases où un peep peut marcher, voisins à 8 directions) de (r, c) ; 0 si eau."""
+        if not (0 <= r < self.grid_height and 0 <= c < self.grid_width):
+            return 0
+        self._refresh_labels()
+        return int(self._land_roots[self._land_local.item(r, c)])
+
+    def same_landmass(self, a, b):
+        """Vrai si les cases a et b (r, c) sont sur la même île (un peep peut aller de l'une à l'autre)."""
+        land = self.landmass_id(*a)
+        return land != 0 and land == self.landmass_id(*b)
+
+    def landmass_size(self, r, c):
+        """Nombre de cases de la terre de (r, c) (0 si eau)."""
+        land = self.landmass_id(r, c)
+        return int(self._land_sizes[land]) if land else 0
+
+    def water_body_id(self, r, c):
+        """Identifiant de l'étendue d'eau (tuiles submergées, 4-connexes) de la tuile (r, c) ; 0 si terre."""
+        if not (0 <= r < self.grid_height and 0 <= c < self.grid_width):
+            return 0
+        self._refresh_labels()
+        return int(self._water_roots[self._water_local.item(r, c)])
+
+    def water_body_size(self, r, c):
+        """Nombre de tuiles de l'étendue d'eau de (r, c) (0 si terre)."""
+        water = self.water_body_id(r, c)
+        return int(self._water_sizes[water]) if water else 0
+
     def do_volcano(self, r, c):
         """
         Crée une montagne à la position (r, c).
         Le terrain monte de 5 immédiatement puis les 9 cases du centre sont randomisées à +/-1.
         Ajoute également 10-30 rochers dans la zone 8x8 autour du sommet.
         """
-        # 1. Monter de 5 niveaux avec propagation
-        for _ in range(5):
-            self.raise_corner(r, c)
-            
-        # 2. Randomisation des 9 cases (3x3) du centre
-        for dr in range(-1, 2):
-            for dc in range(-1, 2):
-                nr, nc = r + dr, c + dc
-                if 0 <= nr <= self.grid_height and 0 <= nc <= self.grid_width:
-                    offset = random.choice([-1, 0, 1])
-                    if offset == 1:
-                        self.raise_corner(nr, nc)
-                    elif offset == -1:
-                        self.lower_corner(nr, nc)
+        with self.batch():
+            # 1. Monter de 5 niveaux avec propagation
+            self.apply_brush([(r, c)], [5])
+
+            # 2. Randomisation des 9 cases (3x3) du centre
+            seeds, deltas = [], []
+            for dr in range(-1, 2):
+                for dc in range(-1, 2):
+                    nr, nc = r + dr, c + dc
+                    if 0 <= nr <= self.grid_height and 0 <= nc <= self.grid_width:
+                        seeds.append((nr, nc))
+                        deltas.append(random.choice([-1, 0, 1]))
+            self.apply_brush(seeds, deltas)
 
         # 3. Ajout de 10-30 rochers dans la zone 8x8 autour
         num_volcano_rocks = random.randint(10, 30)
-        rock_tiles = [(5, 2), (5, 3), (5, 4)]
         for _ in range(num_volcano_rocks):
             # Zone 8x8 centrée (donc -4 à +3 autour de r, c)
             rr = r + random.randint(-4, 3)
@@ -246,55 +1055,60 @@ class GameMap:
             if 0 <= rr < self.grid_height and 0 <= rc < self.grid_width:
                 # On ne place de rochers que s'il n'y a pas d'eau (le volcan crée de la terre)
                 if not self.is_water(rr, rc):
-                    self.rocks[(rr, rc)] = random.choice(rock_tiles)
+                    self.add_rock(rr, rc, random.choice(ROCK_TILE_KEYS))
+
+    def has_rock(self, r, c):
+        return 0 <= r < self.grid_height and 0 <= c < self.grid_width and self.rock_layer.item(r, c) != 0
+
+    def get_rock(self, r, c):
+        """Sprite du rocher de la tuile (r, c), ou None."""
+        if 0 <= r < self.grid_height and 0 <= c < self.grid_width:
+            index = self.rock_layer.item(r, c)
+            if index:
+                return ROCK_TILE_KEYS[index - 1]
+        return None
+
+    def add_rock(self, r, c, tile_key):
+        self.rock_layer[r, c] = ROCK_TILE_KEYS.index(tile_key) + 1
+        self._mark_tiles_dirty(r, r + 1, c, c + 1)
+        self._publish_tiles(TerrainEvent.ROCKS, added=[(r, c)])
 
     def get_raise_cost(self, r, c):
-        backup = [row[:] for row in self.corners]
-        visited = set()
-        changed = []
-        def prop(curr_r, curr_c):
-            if (curr_r, curr_c) in visited:
-                return
-            visited.add((curr_r, curr_c))
-            current = self.get_corner_altitude(curr_r, curr_c)
-            new_alt = current + 1
-            if self.set_corner_altitude(curr_r, curr_c, new_alt):
-                changed.append((curr_r, curr_c))
-                for dr in [-1, 0, 1]:
-                    for dc in [-1, 0, 1]:
-                        if dr == 0 and dc == 0:
-                            continue
-                        nr, nc = curr_r + dr, curr_c + dc
-                        if 0 <= nr <= self.grid_height and 0 <= nc <= self.grid_width:
-                            if new_alt - self.get_corner_altitude(nr, nc) > 1:
-                                prop(nr, nc)
-        prop(r, c)
-        self.corners = backup
-        return len(changed)
+        self._flush_corner_changes()
+        if 0 <= r <= self.grid_height and 0 <= c <= self.grid_width:
+            cost = self._raise_cost.item(r, c)
+            if cost < 0:
+                cost = self.plan_raise(r, c).cost
+                self._raise_cost[r, c] = cost
+                self._costs_cached = True
+            return cost
+        return self.plan_raise(r, c).cost
 
     def get_lower_cost(self, r, c):
-        backup = [row[:] for row in self.corners]
-        visited = set()
-        changed = []
-        def prop(curr_r, curr_c):
-            if (curr_r, curr_c) in visited:
-                return
-            visited.add((curr_r, curr_c))
-            current = self.get_corner_altitude(curr_r, curr_c)
-            new_alt = current - 1
-            if self.set_corner_altitude(curr_r, curr_c, new_alt):
-                changed.append((curr_r, curr_c))
-                for dr in [-1, 0, 1]:
-                    for dc in [-1, 0, 1]:
-                        if dr == 0 and dc == 0:
-                            continue
-                        nr, nc = curr_r + dr, curr_c + dc
-                        if 0 <= nr <= self.grid_height and 0 <= nc <= self.grid_width:
-                            if self.get_corner_altitude(nr, nc) - new_alt > 1:
-                                prop(nr, nc)
-        prop(r, c)
-        self.corners = backup
-        return len(changed)
+        self._flush_corner_changes()
+        if 0 <= r <= self.grid_height and 0 <= c <= self.grid_width:
+            cost = self._lower_cost.item(r, c)
+            if cost < 0:
+                cost = self.plan_lower(r, c).cost
+                self._lower_cost[r, c] = cost
+                self._costs_cached = True
+            return cost
+        return self.plan_lower(r, c).cost
+
+    def get_cost_field(self, r0, r1, c0, c1):
+        """
+        Coûts raise et lower de chaque coin du bloc [r0:r1, c0:c1] (deux grilles int16).
+        Seuls les coins invalidés depuis le dernier appel sont re-simulés.
+        """
+        self._flush_corner_changes()
+        r0, r1 = max(0, r0), min(self.grid_height + 1, r1)
+        c0, c1 = max(0, c0), min(self.grid_width + 1, c1)
+        self._costs_cached = True
+        for field, delta in ((self._raise_cost, 1), (self._lower_cost, -1)):
+            block = field[r0:r1, c0:c1]
+            for lr, lc in np.argwhere(block < 0).tolist():
+                block[lr, lc] = len(self.plan_corners([(r0 + lr, c0 + lc)], delta).changes)
+        return self._raise_cost[r0:r1, c0:c1].copy(), self._lower_cost[r0:r1, c0:c1].copy()
 
     def update(self, dt):
         """Met à jour les animations (eau)."""
@@ -310,6 +1124,16 @@ class GameMap:
             self.flag_frame = 1 - self.flag_frame
 
     def get_tile_key(self, r, c):
+        if 0 <= r < self.grid_height and 0 <= c < self.grid_width:
+            self._refresh_tiles()
+            tile_key = TERRAIN_TILE_KEYS[self._tile_ids.item(r, c)]
+            if tile_key == TILE_WATER and self.water_frame:
+                return TILE_WATER_2
+            return tile_key
+        return self._compute_tile_key(r, c)
+
+    def _compute_tile_key(self, r, c):
+        """Classification scalaire d'origine (utilisée hors de la grille)."""
         a0 = self.get_corner_altitude(r, c)
         a1 = self.get_corner_altitude(r, c + 1)
         a2 = self.get_corner_altitude(r + 1, c + 1)
@@ -333,25 +1157,54 @@ class GameMap:
 
         tile = tile_map.get(d, TILE_FLAT)
 
-        if (r, c) in self.swamps:
+        if self.is_swamp(r, c):
             return TILE_SWAMP
 
         if tile == TILE_FLAT:
-            for h in self.houses:
-                if (r, c) in getattr(h, 'occupied_tiles', []):
-                    if getattr(h, 'team', 'allies') == 'foes':
-                        return TILE_CONSTRUCTED_FOES
-                    return TILE_CONSTRUCTED_ALLIES
+            owners = self._claims.get((r, c))
+            if owners:
+                if getattr(owners[0], 'team', 'allies') == 'foes':
+                    return TILE_CONSTRUCTED_FOES
+                return TILE_CONSTRUCTED_ALLIES
         return tile
 
-    def draw_tile(self, surface, r, c, cam_r=0, cam_c=0, offset_y=0):
+    def classify_tiles(self, r0=0, r1=None, c0=0, c1=None):
+        """
+        Version vectorisée de get_tile_key sur le bloc de tiles [r0:r1, c0:c1].
+        Renvoie une grille uint8 d'identifiants (voir TERRAIN_TILE_KEYS), lue depuis le cache.
+        """
+        r1 = self.grid_height if r1 is None else r1
+        c1 = self.grid_width if c1 is None else c1
+        self._refresh_tiles()
+        ids = self._tile_ids[r0:r1, c0:c1].copy()
+        # L'animation de l'eau est appliquée à la lecture : le cache reste statique
+        if self.water_frame:
+            ids[ids == TILE_ID_WATER] = TILE_ID_WATER_2
+        return ids
+
+    def _classify_block(self, r0, r1, c0, c1, codes):
+        """Classe le bloc [r0:r1, c0:c1] à partir de ses codes de pente (eau toujours en frame 0)."""
+        ids = SLOPE_LUT[codes]
+        water = ids == TILE_ID_WATER
+
+        ids[self.swamp_layer[r0:r1, c0:c1] & ~water] = TILE_ID_SWAMP
+
+        # Territoire : la première maison (ordre de la liste) qui réclame une tile plate l'emporte
+        flat = ids == TILE_ID_FLAT
+        territory = self._territory[r0:r1, c0:c1]
+        ids[flat & (territory == TERRITORY_ALLIES)] = TILE_ID_CONSTRUCTED_ALLIES
+        ids[flat & (territory == TERRITORY_FOES)] = TILE_ID_CONSTRUCTED_FOES
+        return ids
+
+    def draw_tile(self, surface, r, c, cam_r=0, cam_c=0, offset_y=0, tile_key=None, offset_x=0):
         a0 = self.get_corner_altitude(r, c)
         a1 = self.get_corner_altitude(r, c + 1)
         a2 = self.get_corner_altitude(r + 1, c + 1)
         a3 = self.get_corner_altitude(r + 1, c)
         min_alt = min(a0, a1, a2, a3)
 
-        tile_key = self.get_tile_key(r, c)
+        if tile_key is None:
+            tile_key = self.get_tile_key(r, c)
         tile_surf = self.tile_surfaces.get(tile_key)
         if tile_surf is None:
             return
@@ -360,34 +1213,32 @@ class GameMap:
         # Le tile doit être positionné pour que le sommet haut du losange soit centré horizontalement
         sx, sy = self.world_to_screen(r, c, min_alt, cam_r, cam_c)
         sy += offset_y
-        blit_x = sx - TILE_HALF_W
-        if tile_key in (TILE_FLAT, TILE_CONSTRUCTED_ALLIES, TILE_CONSTRUCTED_FOES, TILE_SWAMP):
+        blit_x = sx - TILE_HALF_W + offset_x
+        if tile_key in RAISED_TILE_KEYS:
             blit_y = sy + TILE_HALF_H  # Décale de 8 pixels vers le bas pour les tiles plates
         else:
             blit_y = sy
 
-        # Remplir les faces latérales visibles avec des copies empilées de TILE_FLAT
-        # gap = distance en pixels entre blit_y et le niveau de sol de référence (alt=0)
+        # Faces latérales visibles : copies empilées de TILE_FLAT sous la tile, pré-composées
+        # avec elle (column_surfaces). gap = distance en pixels entre blit_y et le niveau 0
         _, sy0 = self.world_to_screen(r, c, 0, cam_r, cam_c)
-        gap = sy0 - blit_y
-        n_copies = gap // TILE_HALF_H
-        if n_copies > 0:
-            flat_surf = self.tile_surfaces.get(TILE_FLAT)
-            if flat_surf is not None:
-                for k in range(n_copies, 0, -1):  # du bas vers le haut
-                    surface.blit(flat_surf, (blit_x, blit_y + k * TILE_HALF_H))
-
-        surface.blit(tile_surf, (blit_x, blit_y))
+        gap = sy0 + offset_y - blit_y
+        n_copies = max(0, gap // TILE_HALF_H)
+        column = self.column_surfaces.get((tile_key, n_copies))
+        if column is None:
+            column = compose_column(self.tile_surfaces, tile_key, n_copies)
+            self.column_surfaces[(tile_key, n_copies)] = column
+        surface.blit(column, (blit_x, blit_y))
 
         # Dessiner le rocher s'il y en a un sur cette case
-        rock = self.rocks.get((r, c))
+        rock = self.get_rock(r, c)
         if rock:
             rock_surf = self.tile_surfaces.get(rock)
             if rock_surf:
                 # Calcul de l'altitude du rocher
                 # Si la tile est plate (1, 6) ou construite, on monte le rocher d'un niveau (8px)
                 rock_blit_y = blit_y
-                if tile_key in (TILE_FLAT, TILE_CONSTRUCTED_ALLIES, TILE_CONSTRUCTED_FOES, TILE_SWAMP):
+                if tile_key in RAISED_TILE_KEYS:
                     rock_blit_y -= TILE_HALF_H
                 
                 # Les rochers sont des sprites qui se placent sur le tile
@@ -408,90 +1259,84 @@ class GameMap:
     def get_visible_bounds(self, cam_r, cam_c):
         start_r = int(cam_r)
         start_c = int(cam_c)
-        end_r = min(self.grid_height, start_r + 8)
-        end_c = min(self.grid_width, start_c + 8)
+        end_r = min(self.grid_height, start_r + self.view_size)
+        end_c = min(self.grid_width, start_c + self.view_size)
         return start_r, end_r, start_c, end_c
 
     def draw(self, surface, cam_r=0, cam_c=0, offset_y=0):
         start_r = int(cam_r)
         start_c = int(cam_c)
-        end_r = min(self.grid_height, start_r + 8)
-        end_c = min(self.grid_width, start_c + 8)
+        end_r = min(self.grid_height, start_r + self.view_size)
+        end_c = min(self.grid_width, start_c + self.view_size)
 
+        # Une seule classification vectorisée pour toute la vue
+        tile_ids = self.classify_tiles(start_r, end_r, start_c, end_c).tolist()
+        # Tous les blits de la vue en un seul appel
+        batch = RenderBatch(surface)
         for r in range(start_r, end_r):
+            row_ids = tile_ids[r - start_r]
             for c in range(start_c, end_c):
-                self.draw_tile(surface, r, c, cam_r, cam_c, offset_y=offset_y)
+                tile_key = TERRAIN_TILE_KEYS[row_ids[c - start_c]]
+                self.draw_tile(batch, r, c, cam_r, cam_c, offset_y=offset_y, tile_key=tile_key)
+        batch.flush()
 
     def get_flat_area_score(self, r, c, current_house=None, is_castle=False):
-        # Ne pas construire sur un marécage
-        if (r, c) in self.swamps:
-            return -1, []
-            
-        # Retourne le score basé sur la zone d'influence et la liste des tuiles valid_tiles
-        a = self.get_corner_altitude(r, c)
-        b = self.get_corner_altitude(r, c + 1)
-        c_ = self.get_corner_altitude(r + 1, c + 1)
-        d = self.get_corner_altitude(r + 1, c)
-
-        if not (a == b == c_ == d and a > 0):
+        """
+        Score de la zone d'influence centrée sur (r, c) et liste des tuiles comptées
+        (plates, hors d'eau, sans rocher ni marécage). -1 si le centre n'est pas constructible.
+        """
+        if not self._is_valid_center(r, c):
             return -1, []
-            
-        base_alt = a
+        rows = self._buildable_rows
         valid_tiles = []
-        
-        if is_castle:
-            # Pour un château, on prend les 24 tuiles autour (carré 5x5 complet, sans le centre)
-            influence_mask = [
-                (1, 1, 1, 1, 1),
-                (1, 1, 1, 1, 1),
-                (1, 1, 0, 1, 1),
-                (1, 1, 1, 1, 1),
-                (1, 1, 1, 1, 1)
-            ]
-        else:
-            # Pour les autres, masque spécifique de 16 tuiles
-            influence_mask = [
-                (1, 0, 1, 0, 1),
-                (0, 1, 1, 1, 0),
-                (1, 1, 0, 1, 1),
-                (0, 1, 1, 1, 0),
-                (1, 0, 1, 0, 1)
-            ]
-
-        # Parcours du voisinage 5x5
-        for dr in range(-2, 3):
-            for dc in range(-2, 3):
-                if dr == 0 and dc == 0:
-                    continue
-                
-                # Vérifier si la case est dans la zone d'influence (les '1')
-                if influence_mask[dr + 2][dc + 2] == 0:
-                    continue
-                
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < self.grid_height and 0 <= nc < self.grid_width:
-                    # Un rocher ou un marécage empêche la tuile d'être comptée dans l'influence/construction
-                    if (nr, nc) in self.rocks or (nr, nc) in self.swamps:
-                        continue
-                        
-                    na = self.get_corner_altitude(nr, nc)
-                    nb = self.get_corner_altitude(nr, nc + 1)
-                    nc_ = self.get_corner_altitude(nr + 1, nc + 1)
-                    nd = self.get_corner_altitude(nr + 1, nc)
-                    # La tuile doit être plate (coins égaux) et au-dessus de l'eau (>0)
-                    if na == nb == nc_ == nd and na > 0:
-                        valid_tiles.append((nr, nc))
-                    
+        for dr, pattern in zip(range(-2, 3), INFLUENCE_BITS[is_castle]):
+            nr = r + dr
+            if 0 <= nr < self.grid_height:
+                bits = _influence_window(rows[nr], c) & pattern
+                while bits:
+                    low = bits & -bits
+                    valid_tiles.append((nr, c + low.bit_length() - 3))
+                    bits ^= low
         return len(valid_tiles), valid_tiles
 
+    def get_flat_score(self, r, c, is_castle=False):
+        """Score seul de get_flat_area_score : popcount des bits masqués, sans liste de tuiles."""
+        if not self._is_valid_center(r, c):
+            return -1
+        rows = self._buildable_rows
+        score = 0
+        for dr, pattern in zip(range(-2, 3), INFLUENCE_BITS[is_castle]):
+            nr = r + dr
+            if 0 <= nr < self.grid_height:
+                score += (_influence_window(rows[nr], c) & pattern).bit_count()
+        return score
+
+    def get_flat_scores(self, centers, is_castle=False):
+        """
+        Version groupée de get_flat_score : un score par centre (r, c) de la liste, lu dans
+        les scores tenus à jour par l'index des sites (-1 hors carte).
+        """
+        self._refresh_sites()
+        scores = self._castle_scores if is_castle else self._house_scores
+        height, width = self.grid_height, self.grid_width
+        return [scores.item(r, c) if 0 <= r < height and 0 <= c < width else -1 for r, c in centers]
+
+    def _is_valid_center(self, r, c):
+        """Centre d'une zone d'influence : tuile plate hors d'eau et sans marécage (rocher toléré)."""
+        if not (0 <= r < self.grid_height and 0 <= c < self.grid_width):
+            return False
+        self._refresh_tiles()
+        return self._flat.item(r, c) and not self.swamp_layer.item(r, c)
+
     def draw_houses(self, surface, cam_r=0, cam_c=0, show_debug=False, debug_font=None, offset_y=0):
         start_r = int(cam_r)
         start_c = int(cam_c)
-        end_r = min(self.grid_height, start_r + 8)
-        end_c = min(self.grid_width, start_c + 8)
+        end_r = min(self.grid_height, start_r + self.view_size)
+        end_c = min(self.grid_width, start_c + self.view_size)
 
         from peep import Peep
         peep_sprites = Peep.get_sprites()
+        batch = RenderBatch(surface)
 
         for house in sorted(self.houses, key=lambda h: h.r + h.c):
             if house.building_type == 'castle':
@@ -527,11 +1372,11 @@ class GameMap:
                             if tile_surf is not None:
                                 sx, sy = self.world_to_screen(nr, nc, alt, cam_r, cam_c)
                                 sy += offset_y
-                                surface.blit(tile_surf, (sx - TILE_HALF_W, sy))
+                                batch.blit(tile_surf, (sx - TILE_HALF_W, sy))
                 if flag_surf is not None and start_r <= house.r < end_r and start_c <= house.c < end_c:
                     sx, sy = self.world_to_screen(house.r, house.c, self.get_corner_altitude(house.r, house.c), cam_r, cam_c)
                     sy += offset_y
-                    surface.blit(flag_surf, (sx, sy))
+                    batch.blit(flag_surf, (sx, sy))
                 # Affichage debug vie château (centre)
                 if show_debug and debug_font is not None and start_r <= house.r < end_r and start_c <= house.c < end_c:
                     sx, sy = self.world_to_screen(house.r, house.c, self.get_corner_altitude(house.r, house.c), cam_r, cam_c)
@@ -541,7 +1386,7 @@ class GameMap:
                     life_text = debug_font.render(f"{int(house.life)}", True, color)
                     text_x = sx - life_text.get_width() // 2
                     text_y = sy - 24
-                    surface.blit(life_text, (text_x, text_y))
+                    batch.blit(life_text, (text_x, text_y))
                 continue
 
             alt = self.get_corner_altitude(house.r, house.c)
@@ -553,13 +1398,13 @@ class GameMap:
             sy += offset_y
             blit_x = sx - TILE_HALF_W
             blit_y = sy
-            surface.blit(tile_surf, (blit_x, blit_y))
+            batch.blit(tile_surf, (blit_x, blit_y))
 
             # Drapeau d'équipe animé (sprites 4,0 et 4,1)
             if flag_surf is not None:
                 flag_x = blit_x + TILE_HALF_W
                 flag_y = blit_y
-                surface.blit(flag_surf, (flag_x, flag_y))
+                batch.blit(flag_surf, (flag_x, flag_y))
 
             # Affichage debug vie bâtiment
             if show_debug and debug_font is not None:
@@ -568,60 +1413,80 @@ class GameMap:
                 life_text = debug_font.render(f"{int(house.life)}", True, color)
                 text_x = sx - life_text.get_width() // 2
                 text_y = blit_y - 24
-                surface.blit(life_text, (text_x, text_y))
+                batch.blit(life_text, (text_x, text_y))
+
+        batch.flush()
 
     def _enforce_height_constraints(self):
         """Passe de lissage : garantit que tous les voisins à 8 directions diffèrent de max 1."""
-        changed = True
-        while changed:
-            changed = False
-            for r in range(self.grid_height + 1):
-                for c in range(self.grid_width + 1):
-                    for dr, dc in [(0,1),(0,-1),(1,0),(-1,0),(1,1),(1,-1),(-1,1),(-1,-1)]:
-                        nr, nc = r + dr, c + dc
-                        if 0 <= nr <= self.grid_height and 0 <= nc <= self.grid_width:
-                            if self.corners[r][c] - self.corners[nr][nc] > 1:
-                                self.corners[r][c] = self.corners[nr][nc] + 1
-                                changed = True
+        self.corners[:] = chebyshev_envelope(self.corners)
+        self._heights_rewritten()
 
     def set_all_altitude(self, value):
-        for r in range(self.grid_height + 1):
-            for c in range(self.grid_width + 1):
-                self.corners[r][c] = value
+        self.corners.fill(max(ALTITUDE_MIN, min(value, ALTITUDE_MAX)))
+        self._heights_rewritten()
 
     def randomize(self, min_level=0, max_level=7):
-        self.corners[0][0] = random.randint(min_level, max_level)
+        # Génération séquentielle (chaque coin dépend de ses voisins gauche/haut) :
+        # on travaille sur des listes Python puis on recopie dans le ndarray.
+        corners = [[0] * (self.grid_width + 1) for _ in range(self.grid_height + 1)]
+        corners[0][0] = random.randint(min_level, max_level)
         for c in range(1, self.grid_width + 1):
-            prev = self.corners[0][c - 1]
-            self.corners[0][c] = max(min_level, min(max_level, prev + random.choice([-1, 0, 1])))
+            prev = corners[0][c - 1]
+            corners[0][c] = max(min_level, min(max_level, prev + random.choice([-1, 0, 1])))
         for r in range(1, self.grid_height + 1):
-            prev = self.corners[r - 1][0]
-            self.corners[r][0] = max(min_level, min(max_level, prev + random.choice([-1, 0, 1])))
+            prev = corners[r - 1][0]
+            corners[r][0] = max(min_level, min(max_level, prev + random.choice([-1, 0, 1])))
             for c in range(1, self.grid_width + 1):
-                left = self.corners[r][c - 1]
-                up = self.corners[r - 1][c]
+                left = corners[r][c - 1]
+                up = corners[r - 1][c]
                 lo = max(min_level, left - 1, up - 1)
                 hi = min(max_level, left + 1, up + 1)
                 base = max(lo, min(hi, (left + up) // 2 + random.choice([-1, 0, 1])))
-                self.corners[r][c] = base
+                corners[r][c] = base
+        self.corners[:] = corners
         self._enforce_height_constraints()
 
+        self.start_positions = {}
+
         # Génération des rochers
-        self.rocks.clear()
-        rock_tiles = [(5, 2), (5, 3), (5, 4)]
+        removed = [tuple(rc) for rc in np.argwhere(self.rock_layer).tolist()]
+        self.rock_layer.fill(0)
         # 100 +/- 100 rochers
         num_rocks = 100 + random.randint(-50, 50)
+        water = self.water_mask()
         for _ in range(num_rocks):
             rr = random.randint(0, self.grid_height - 1)
             rc = random.randint(0, self.grid_width - 1)
-            if not self.is_water(rr, rc):
-                self.rocks[(rr, rc)] = random.choice(rock_tiles)
+            if not water[rr, rc]:
+                tile_key = random.choice(ROCK_TILE_KEYS)
+                self.rock_layer[rr, rc] = ROCK_TILE_KEYS.index(tile_key) + 1
+        self._mark_all_dirty()
+        added = [tuple(rc) for rc in np.argwhere(self.rock_layer).tolist()]
+        self._publish(TerrainEvent.ROCKS, 0, self.grid_height, 0, self.grid_width, added, removed)
+
+    def generate(self, key=None, seed=None, style='default', peeps_per_team=5):
+        """Remplace la carte par celle du générateur (voir map_generator.generate_map) et la renvoie."""
+        from map_generator import generate_map
+        generated = generate_map(self.grid_width, self.grid_height, key, seed, style, peeps_per_team)
+        self.load_generated(generated)
+        return generated
+
+    def load_generated(self, generated):
+        """Applique une GameMap générée : altitudes, rochers et positions de départ."""
+        self.corners[:] = generated.corners
+        removed = [tuple(rc) for rc in np.argwhere(self.rock_layer).tolist()]
+        self.rock_layer[:] = generated.rock_layer
+        self.start_positions = {team: list(cells) for team, cells in generated.start_positions.items()}
+        self._heights_rewritten()
+        added = [tuple(rc) for rc in np.argwhere(self.rock_layer).tolist()]
+        self._publish(TerrainEvent.ROCKS, 0, self.grid_height, 0, self.grid_width, added, removed)
 
     def is_flat_and_buildable(self, r, c):
         if r < 0 or c < 0 or r >= self.grid_height or c >= self.grid_width:
             return False
         # Un rocher empêche la construction
-        if (r, c) in self.rocks:
+        if self.rock_layer.item(r, c):
             return False
         a = self.get_corner_altitude(r, c)
         b = self.get_corner_altitude(r, c + 1)
@@ -629,10 +1494,7 @@ class GameMap:
         d = self.get_corner_altitude(r + 1, c)
         if a == b == c_ == d and a > 0:
             # Vérifier qu'aucune maison ne réclame déjà cette tuile
-            for h in self.houses:
-                if (r, c) in getattr(h, 'occupied_tiles', []):
-                    return False
-            return True
+            return (r, c) not in self._claims
         return False
 
     def is_flat_and_buildable_any_alt(self, r, c):
@@ -640,17 +1502,14 @@ class GameMap:
         if r < 0 or c < 0 or r >= self.grid_height or c >= self.grid_width:
             return False
         # Un rocher empêche l'influence/construction
-        if (r, c) in self.rocks:
+        if self.rock_layer.item(r, c):
             return False
         a = self.get_corner_altitude(r, c)
         b = self.get_corner_altitude(r, c + 1)
         c_ = self.get_corner_altitude(r + 1, c + 1)
         d = self.get_corner_altitude(r + 1, c)
         if a == b == c_ == d and a > 0:
-            for h in self.houses:
-                if (r, c) in getattr(h, 'occupied_tiles', []):
-                    return False
-            return True
+            return (r, c) not in self._claims
         return False
 
     def _get_construction_offsets(self, scan_size=25):
@@ -665,46 +1524,195 @@ class GameMap:
         return offsets[: max(0, min(scan_size, len(offsets)))]
 
     def can_place_house_initial(self, r, c):
-        """Validation de pose initiale: espace 1 tuile entre bâtiments, 2 pour castle."""
-        if not self.is_flat_and_buildable(r, c):
+        """
+        Validation de pose initiale: espace 1 tuile entre bâtiments, 2 pour castle.
+        Lecture de l'index des sites (voir _refresh_sites pour les règles).
+        """
+        if not (0 <= r < self.grid_height and 0 <= c < self.grid_width):
             return False
+        self._refresh_sites()
+        return self._house_sites.item(r, c)
 
-        # On utilise les nouvelles fonctions de scoring robustes
-        score_castle, _ = self.get_flat_area_score(r, c, is_castle=True)
-        score_normal, _ = self.get_flat_area_score(r, c, is_castle=False)
-        
-        from house import House
-        if score_castle >= 24:
-            is_castle = True
-        else:
-            is_castle = False
-        
-        # Distance minimale obligatoire
-        # dist est la distance de Chebyshev (max(abs(dr), abs(dc)))
-        for h in self.houses:
-            if getattr(h, 'destroyed', False):
+    def best_site_near(self, r, c, radius, min_score=0, exclude=(), castle=False):
+        """
+        Meilleur site de construction à distance de Chebyshev <= radius de (r, c) :
+        score d'influence maximal, puis le plus proche. None si aucun site.
+        `castle=True` se limite aux sites où un château peut être posé.
+        """
+        self._refresh_sites()
+        r0, r1 = max(0, r - radius), min(self.grid_height, r + radius + 1)
+        c0, c1 = max(0, c - radius), min(self.grid_width, c + radius + 1)
+        if r0 >= r1 or c0 >= c1:
+            return None
+        sites = self._castle_sites if castle else self._house_sites
+        scores = self._house_scores[r0:r1, c0:c1]
+        best = None
+        best_key = None
+        for lr, lc in np.argwhere(sites[r0:r1, c0:c1] & (scores >= min_score)).tolist():
+            site = (r0 + lr, c0 + lc)
+            if site in exclude:
                 continue
-            
-            dist = max(abs(h.r - r), abs(h.c - c))
-            h_is_castle = (h.building_type == 'castle')
-
-            # Un castle (centre r,c) influence un carré 5x5 (r-2..r+2, c-2..c+2).
-            # Pour qu'un nouveau bâtiment ne vole AUCUNE case à un château existant,
-            # il doit être à une distance de Chebyshev >= 3.
-            # Cependant, l'utilisateur demande explicitement :
-            # 1. Aucun bâtiment à moins de 3 cases du centre d'un château (donc dist >= 4).
-            # 2. Deux châteaux ne peuvent pas être à moins de 4 cases (car ils se voleraient des tuiles mutuellement).
-            
-            if h_is_castle or is_castle:
-                # Si l'un des deux est un château, distance de sécurité accrue
-                if dist < 4:
-                    return False
-            else:
-                # Entre deux maisons normales, distance de 2 (une case vide)
-                if dist < 2:
-                    return False
-        return True
+            key = (-scores.item(lr, lc), max(abs(site[0] - r), abs(site[1] - c)), site)
+            if best_key is None or key < best_key:
+                best, best_key = site, key
+        return best
+
+    def _refresh_sites(self):
+        """
+        Recalcule l'index des sites sur le rectangle invalidé. Un site accepte une maison si :
+        tuile plate hors d'eau, sans rocher ni propriétaire, aucun château vivant à moins de 4,
+        et aucun bâtiment vivant à moins de 2 (à moins de 4 si la zone 5x5 permet un château).
+        """
+        self._refresh_tiles()
+        if not self._site_dirty.any():
+            return
+        for block in self._take_dirty_blocks(self._site_dirty):
+            self._refresh_site_block(*block)
+
+    def _refresh_site_block(self, r0, r1, c0, c1):
+        # Tuiles constructibles du bloc élargi de 2 (hors carte = non constructible)
+        padded = np.zeros((r1 - r0 + 4, c1 - c0 + 4), dtype=np.int8)
+        pr0, pc0 = max(0, r0 - 2), max(0, c0 - 2)
+        pr1, pc1 = min(self.grid_height, r1 + 2), min(self.grid_width, c1 + 2)
+        padded[pr0 - r0 + 2:pr1 - r0 + 2, pc0 - c0 + 2:pc1 - c0 + 2] = self._buildable[pr0:pr1, pc0:pc1]
+        castle_counts = _masked_sums(padded, CASTLE_INFLUENCE_MASK)
+        house_counts = _masked_sums(padded, HOUSE_INFLUENCE_MASK)
+
+        center_ok = self._flat[r0:r1, c0:c1] & ~self.swamp_layer[r0:r1, c0:c1]
+        castle_capable = center_ok & (castle_counts == 24)
+        self._house_scores[r0:r1, c0:c1] = np.where(center_ok, house_counts, -1)
+        self._castle_scores[r0:r1, c0:c1] = np.where(center_ok, castle_counts, -1)
+
+        base = (self._flat[r0:r1, c0:c1] & (self.rock_layer[r0:r1, c0:c1] == 0)
+                & (self._territory[r0:r1, c0:c1] == TERRITORY_NONE)
+                & (self._castle_near4[r0:r1, c0:c1] == 0))
+        spacing = np.where(castle_capable, self._near4[r0:r1, c0:c1], self._near2[r0:r1, c0:c1]) == 0
+        self._house_sites[r0:r1, c0:c1] = base & spacing
+        self._castle_sites[r0:r1, c0:c1] = base & spacing & castle_capable
+
+    def _index_house(self, house, sign, is_castle):
+        """Ajoute (sign=1) ou retire (sign=-1) un bâtiment vivant des compteurs de voisinage."""
+        r, c = house.r, house.c
+        self._near2[max(0, r - 1):r + 2, max(0, c - 1):c + 2] += sign
+        self._near4[max(0, r - 3):r + 4, max(0, c - 3):c + 4] += sign
+        if is_castle:
+            self._castle_near4[max(0, r - 3):r + 4, max(0, c - 3):c + 4] += sign
+        self._mark_sites_dirty(r - 3, r + 4, c - 3, c + 4)
+
+    def _unindex_house(self, house):
+        if house in self._indexed_houses:
+            self._index_house(house, -1, self._indexed_houses.pop(house))
+
+    def set_house_type(self, house, building_type):
+        """Change le type d'un bâtiment (un château élargit la distance imposée aux voisins)."""
+        house.building_type = building_type
+        was_castle = self._indexed_houses.get(house)
+        is_castle = building_type == 'castle'
+        if was_castle is not None and was_castle != is_castle:
+            self._indexed_houses[house] = is_castle
+            r, c = house.r, house.c
+            self._castle_near4[max(0, r - 3):r + 4, max(0, c - 3):c + 4] += 1 if is_castle else -1
+            self._mark_sites_dirty(r - 3, r + 4, c - 3, c + 4)
+
+    def destroy_house(self, house):
+        """Marque un bâtiment détruit : il ne compte plus pour l'espacement des constructions."""
+        house.destroyed = True
+        self._unindex_house(house)
 
     def add_house(self, house):
         self.houses.append(house)
+        self._house_seq[house] = self._next_house_seq
+        self._next_house_seq += 1
+        self._claim_tiles(house, getattr(house, 'occupied_tiles', []))
+        if not getattr(house, 'destroyed', False):
+            is_castle = house.building_type == 'castle'
+            self._indexed_houses[house] = is_castle
+            self._index_house(house, 1, is_castle)
+
+    def remove_house(self, house):
+        self.houses.remove(house)
+        self._unclaim_tiles(house, getattr(house, 'occupied_tiles', []))
+        self._unindex_house(house)
+        del self._house_seq[house]
+
+    def clear_houses(self):
+        for house in self.houses:
+            self._mark_tile_list_dirty(getattr(house, 'occupied_tiles', []))
+        self.houses.clear()
+        self._claims.clear()
+        self._territory.fill(TERRITORY_NONE)
+        self._house_seq.clear()
+        self._indexed_houses.clear()
+        for counts in (self._near2, self._near4, self._castle_near4):
+            counts.fill(0)
+        self._mark_sites_dirty(0, self.grid_height, 0, self.grid_width)
+        self._publish(TerrainEvent.TERRITORY, 0, self.grid_height, 0, self.grid_width)
+
+    def set_house_tiles(self, house, tiles):
+        """Change le territoire d'une maison et met à jour la grille de propriété (tuiles retirées et ajoutées)."""
+        old_tiles = getattr(house, 'occupied_tiles', [])
+        house.occupied_tiles = tiles
+        if house not in self._house_seq:
+            return
+        # Appelé à chaque tick par House.update : un territoire inchangé ne coûte rien
+        old_set, new_set = set(old_tiles), set(tiles)
+        if old_set == new_set:
+            return
+        self._unclaim_tiles(house, [t for t in old_tiles if t not in new_set])
+        self._claim_tiles(house, [t for t in tiles if t not in old_set])
+
+    def set_house_team(self, house, team):
+        house.team = team
+        if house in self._house_seq:
+            self._update_territory(getattr(house, 'occupied_tiles', []))
+
+    def get_tile_owners(self, r, c):
+        """Maisons (y compris détruites) qui revendiquent la tuile, dans l'ordre de self.houses."""
+        return self._claims.get((r, c), ())
+
+    def get_tile_owner(self, r, c, exclude=None):
+        """Première maison non détruite (autre que `exclude`) qui revendique la tuile, sinon None."""
+        for house in self._claims.get((r, c), ()):
+            if house is not exclude and not getattr(house, 'destroyed', False):
+                return house
+        return None
+
+    def _claim_tiles(self, house, tiles):
+        seq = self._house_seq[house]
+        for tile in tiles:
+            owners = self._claims.setdefault(tile, [])
+            # Insertion à sa place dans l'ordre de self.houses (listes de 1 ou 2 maisons)
+            i = len(owners)
+            while i > 0 and self._house_seq[owners[i - 1]] > seq:
+                i -= 1
+            owners.insert(i, house)
+        self._update_territory(tiles)
+
+    def _unclaim_tiles(self, house, tiles):
+        for tile in tiles:
+            owners = self._claims.get(tile)
+            if owners and house in owners:
+                owners.remove(house)
+                if not owners:
+                    del self._claims[tile]
+        self._update_territory(tiles)
+
+    def _update_territory(self, tiles):
+        changed = []
+        for (r, c) in tiles:
+            if 0 <= r < self.grid_height and 0 <= c < self.grid_width:
+                owners = self._claims.get((r, c))
+                if not owners:
+                    team = TERRITORY_NONE
+                elif getattr(owners[0], 'team', 'allies') == 'foes':
+                    team = TERRITORY_FOES
+                else:
+                    team = TERRITORY_ALLIES
+                if self._territory.item(r, c) != team:
+                    self._territory[r, c] = team
+                    changed.append((r, c))
+        # Tiles et sites ne lisent que l'équipe propriétaire : une tuile dont elle ne
+        # change pas (autre maison de la même équipe) ne demande aucune reclassification
+        self._mark_tile_list_dirty(changed)
+        self._publish_tiles(TerrainEvent.TERRITORY, added=changed)
 
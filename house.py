@@ -33,7 +33,7 @@ class House:
         score_normal, valid_tiles_normal = game_map.get_flat_area_score(self.r, self.c, current_house=self, is_castle=False)
 
         if score_normal == -1: # Case d'habitation non constructible
-            self.destroyed = True
+            game_map.destroy_house(self)
             return
 
         # Détermination du Tier potentiel (avant filtrage territorial)
@@ -50,32 +50,21 @@ class House:
             potential_valid_tiles = valid_tiles_normal
 
         # Vérifier d'abord s'il y a un conflit sur la case centrale (déjà géré par score=-1 mais sécurité)
-        center_conflict = False
-        for other in game_map.houses:
-            if other != self and not getattr(other, 'destroyed', False):
-                # Si l'autre existe déjà physiquement (pas juste planifié) et possède la case
-                if (self.r, self.c) in getattr(other, 'occupied_tiles', []):
-                    center_conflict = True
-                    break
+        # Si une autre maison existante possède la case centrale
+        center_conflict = game_map.get_tile_owner(self.r, self.c, exclude=self) is not None
         
         if center_conflict:
-            self.destroyed = True
+            game_map.destroy_house(self)
             return
 
         # Filtrer les potential_valid_tiles pour ignorer les cases revendiquées par n'importe quel voisin (concurrence territoriale)
-        filtered_valid_tiles = []
-        for t in potential_valid_tiles:
-            can_claim = True
-            for other in game_map.houses:
-                if other != self and not getattr(other, 'destroyed', False):
-                    # RÈGLE DE PRIORITÉ : L'ancien bâtiment (déjà présent sur la map)
-                    # a la priorité absolue sur ses tuiles.
-                    # Un nouveau bâtiment ne peut JAMAIS voler une tuile déjà possédée par un autre.
-                    if t in getattr(other, 'occupied_tiles', []):
-                        can_claim = False
-                        break
-            if can_claim:
-                filtered_valid_tiles.append(t)
+        # RÈGLE DE PRIORITÉ : L'ancien bâtiment (déjà présent sur la map)
+        # a la priorité absolue sur ses tuiles.
+        # Un nouveau bâtiment ne peut JAMAIS voler une tuile déjà possédée par un autre.
+        filtered_valid_tiles = [
+            t for t in potential_valid_tiles
+            if game_map.get_tile_owner(t[0], t[1], exclude=self) is None
+        ]
 
         # PROTECTION DES CHÂTEAUX : Si on est un bâtiment existant et qu'on était un château,
         # on ne met à jour nos tuiles QUE si le terrain change (plus de cases valides théoriques).
@@ -85,7 +74,7 @@ class House:
             # Cela empêche l'effet de "tremblote" ou de réduction lors de la construction d'un voisin.
             pass
         else:
-            self.occupied_tiles = filtered_valid_tiles
+            game_map.set_house_tiles(self, filtered_valid_tiles)
         
         score = len(self.occupied_tiles)
 
@@ -111,7 +100,7 @@ class House:
                     max_tier = i
             max_tier = min(len(self.TYPES) - 2, max_tier)
 
-        self.building_type = self.TYPES[max_tier]
+        game_map.set_house_type(self, self.TYPES[max_tier])
         
         # Nouvelle logique : croissance de la santé selon la matrice
         growth_speed = self.GROWTH_SPEEDS[max_tier]
@@ -0,0 +1,100 @@
+"""
+Générateur de cartes reproductibles : une clé (ou une graine) et un style de terrain donnent
+toujours la même carte (altitudes, rochers, positions de départ des peeps), comme dans le jeu
+original. Tout est vectorisé et tiré d'un générateur numpy isolé (le module random n'est pas touché).
+"""
+import hashlib
+import numpy as np
+from settings import ALTITUDE_MIN, ALTITUDE_MAX
+from game_map import ROCK_TILE_KEYS, chebyshev_envelope
+
+
+# Typologies de terrain :
+# - scales / weights : taille (en tuiles) et poids des octaves de bruit
+# - sea : profondeur virtuelle sous le niveau 0 (plus elle est grande, plus il y a d'eau)
+# - top : altitude max visée avant lissage
+# - rocks : rochers par tuile
+TERRAIN_STYLES = {
+    'default': {'scales': (16, 8, 4), 'weights': (1.0, 0.5, 0.25), 'sea': 2.0, 'top': ALTITUDE_MAX, 'rocks': 0.025},
+    'islands': {'scales': (12, 6, 3), 'weights': (1.0, 0.5, 0.25), 'sea': 5.0, 'top': ALTITUDE_MAX, 'rocks': 0.02},
+    'plains': {'scales': (32, 16), 'weights': (1.0, 0.3), 'sea': 1.0, 'top': 4, 'rocks': 0.015},
+    'mountains': {'scales': (8, 4, 2), 'weights': (1.0, 0.6, 0.3), 'sea': 1.0, 'top': ALTITUDE_MAX + 3, 'rocks': 0.04},
+}
+
+
+def key_to_seed(key):
+    """Graine 64 bits stable dérivée d'une clé texte (indépendante de la plateforme et de PYTHONHASHSEED)."""
+    digest = hashlib.sha256(str(key).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+class GeneratedMap:
+    """Résultat de generate_map : à appliquer sur une GameMap avec GameMap.load_generated."""
+    def __init__(self, key, style, corners, rock_layer, start_positions):
+        self.key = key
+        self.style = style
+        self.corners = corners  # int8 (height + 1, width + 1)
+        self.rock_layer = rock_layer  # uint8 (height, width), voir GameMap.rock_layer
+        self.start_positions = start_positions  # { team: [(r, c), ...] }
+
+
+def _value_noise(rng, height, width, scale):
+    """Bruit de valeurs : grille grossière aléatoire (un point toutes les `scale` cases) interpolée."""
+    coarse = rng.random((height // scale + 2, width // scale + 2))
+    rows = np.arange(height) / scale
+    cols = np.arange(width) / scale
+    r0, c0 = rows.astype(np.intp), cols.astype(np.intp)
+    fr, fc = (rows - r0)[:, None], (cols - c0)[None, :]
+    top = coarse[r0][:, c0] * (1 - fc) + coarse[r0][:, c0 + 1] * fc
+    bottom = coarse[r0 + 1][:, c0] * (1 - fc) + coarse[r0 + 1][:, c0 + 1] * fc
+    return top * (1 - fr) + bottom * fr
+
+
+def _pick(rng, cells, count):
+    """`count` cases tirées parmi `cells` (tableau (n, 2)), avec remise s'il n'y en a pas assez."""
+    chosen = rng.choice(len(cells), size=count, replace=len(cells) < count)
+    return [tuple(cell) for cell in cells[chosen].tolist()]
+
+
+def generate_map(width, height, key=None, seed=None, style='default', peeps_per_team=5):
+    """
+    Génère une carte width x height tuiles. La graine vient de `seed`, sinon de `key`
+    (voir key_to_seed) ; sans l'une ni l'autre, elle est tirée au hasard (carte non reproductible).
+    """
+    params = TERRAIN_STYLES[style]
+    if seed is None and key is not None:
+        seed = key_to_seed(key)
+    rng = np.random.default_rng(seed)
+
+    # 1. Altitudes : somme d'octaves de bruit, normalisée puis décalée sous le niveau de la mer
+    noise = np.zeros((height + 1, width + 1))
+    for scale, weight in zip(params['scales'], params['weights']):
+        noise += weight * _value_noise(rng, height + 1, width + 1, scale)
+    noise -= noise.min()
+    noise /= max(noise.max(), 1e-9)
+    levels = np.rint(noise * (params['top'] + params['sea']) - params['sea'])
+    levels = np.clip(levels, ALTITUDE_MIN, ALTITUDE_MAX).astype(np.int8)
+    # Contrainte de pente : voisins (8 directions) à au plus 1 niveau d'écart
+    corners = chebyshev_envelope(levels).astype(np.int8)
+
+    # 2. Rochers, hors des tuiles submergées (les 4 coins à 0)
+    water = ((corners[:-1, :-1] == 0) & (corners[:-1, 1:] == 0)
+             & (corners[1:, :-1] == 0) & (corners[1:, 1:] == 0))
+    rock_layer = np.zeros((height, width), dtype=np.uint8)
+    count = int(params['rocks'] * width * height)
+    rows = rng.integers(0, height, count)
+    cols = rng.integers(0, width, count)
+    kinds = rng.integers(1, len(ROCK_TILE_KEYS) + 1, count, dtype=np.uint8)
+    dry = ~water[rows, cols]
+    rock_layer[rows[dry], cols[dry]] = kinds[dry]
+
+    # 3. Départs : alliés dans la moitié nord-ouest, ennemis dans la moitié sud-est,
+    # sur des cases où un peep peut marcher (coin au-dessus de l'eau)
+    land = np.argwhere(corners[:height, :width] > 0)
+    start_positions = {'allies': [], 'foes': []}
+    if len(land):
+        west = land[:, 0] + land[:, 1] < (height + width) // 2
+        for team, cells in (('allies', land[west]), ('foes', land[~west])):
+            start_positions[team] = _pick(rng, cells if len(cells) else land, peeps_per_team)
+
+    return GeneratedMap(key, style, corners, rock_layer, start_positions)
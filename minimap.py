@@ -1,14 +1,70 @@
 import pygame
-from settings import GRID_WIDTH, GRID_HEIGHT, BLACK, WHITE, RED, GREEN, BLUE
+import numpy as np
+from game_map import TILE_ID_WATER, TILE_ID_WATER_2, TerrainEvent, CHUNK_SIZE
+from settings import GRID_WIDTH, GRID_HEIGHT, VIEW_SIZE, BLACK, WHITE, RED, GREEN, BLUE
 
 class Minimap:
-    def __init__(self, x=10, y=10):
+    def __init__(self, x=10, y=10, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, view_size=VIEW_SIZE):
         # Position of the minimap on the screen
         self.x = x
         self.y = y
-        self.width = GRID_WIDTH + GRID_HEIGHT  # Losange width = 64 + 64 = 128
-        self.height = (GRID_WIDTH + GRID_HEIGHT) // 2  # Losange height = 64
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.view_size = view_size
+        # Décalage X du losange : la pointe haute (r=0, c=0) est à grid_height pixels du bord
+        self.offset = grid_height
+        self.width = grid_width + grid_height  # Losange width = 64 + 64 = 128
+        self.height = (grid_width + grid_height) // 2  # Losange height = 64
         self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
+        # Relief en cache, redessiné seulement sur les chunks signalés par GameMap
+        self._terrain = pygame.Surface((self.width, self.height))
+        self._terrain.set_colorkey(self.COLORKEY)
+        self._map = None
+        self._dirty = set()  # blocs (r0, r1, c0, c1) des chunks à redessiner
+
+    COLORKEY = (255, 0, 255)
+    COLORS = np.array([
+        (0, 0, 200),    # Bleu pour l'eau
+        (120, 200, 0),  # Vert clair (Pente éclairée)
+        (0, 90, 0),     # Vert foncé (Pente ombragée)
+        (0, 150, 0),    # Vert moyen (Plat)
+    ], dtype=np.uint8)
+
+    def _attach(self, game_map):
+        if self._map is not None:
+            self._map.unsubscribe(self._on_terrain_event)
+        self._map = game_map
+        game_map.subscribe(self._on_terrain_event)
+        self._terrain.fill(self.COLORKEY)
+        self._dirty = set(game_map.iter_chunks())
+
+    def _on_terrain_event(self, event):
+        # Seules les altitudes (et donc l'eau) changent la couleur d'un pixel
+        if event.kind != TerrainEvent.HEIGHTS:
+            return
+        r0, r1, c0, c1 = event.rect
+        # Chunks entiers, pour que les blocs d'événements voisins se confondent
+        self._dirty.update(self._map.iter_chunks(r0 - r0 % CHUNK_SIZE, -(-r1 // CHUNK_SIZE) * CHUNK_SIZE,
+                                                 c0 - c0 % CHUNK_SIZE, -(-c1 // CHUNK_SIZE) * CHUNK_SIZE))
+
+    def _render_terrain(self, game_map, r0, r1, c0, c1):
+        """Redessine le relief des tuiles [r0:r1, c0:c1] dans le cache."""
+        # Classification vectorisée : on lit directement la grille de tiles et les coins
+        tile_ids = game_map.classify_tiles(r0, r1, c0, c1)
+        water = (tile_ids == TILE_ID_WATER) | (tile_ids == TILE_ID_WATER_2)
+        corners = game_map.corners[r0:r1 + 1, c0:c1 + 1].astype(np.int16)
+        # Calcul du relief (pente) en comparant les altitudes opposées
+        # La lumière vient généralement du haut/gauche dans les jeux isométriques
+        slope = (corners[1:, 1:] - corners[:-1, :-1]) + (corners[:-1, 1:] - corners[1:, :-1])
+        shade = np.where(water, 0, np.where(slope > 0, 1, np.where(slope < 0, 2, 3)))
+
+        # Projection isométrique minimale (grid_height de décalage X de base, moité pour Y)
+        rows, cols = np.mgrid[r0:r1, c0:c1]
+        px = cols + self.offset - rows
+        py = (cols + rows) // 2
+        pixels = pygame.surfarray.pixels3d(self._terrain)
+        pixels[px, py] = self.COLORS[shade]
+        del pixels
 
     def draw(self, surface, game_map, camera, peeps=None):
         if peeps is None:
@@ -20,42 +76,21 @@ class Minimap:
         # --- Rendu de la minimap (Moteur _draw_map) ---
         # "Le code convertit les coordonnÃ©es tuiles (X, Y) en pixels-Ã©crans selon une formule : 
         # Y = (X_tuile + Y_tuile) / 2
-        # X = (X_tuile + 64) - Y_tuile"
+        # X = (X_tuile + 64) - Y_tuile" (64 = grid_height, voir self.offset)
 
-        for r in range(GRID_HEIGHT):
-            for c in range(GRID_WIDTH):
-                a0 = game_map.get_corner_altitude(r, c)
-                a1 = game_map.get_corner_altitude(r, c + 1)
-                a2 = game_map.get_corner_altitude(r + 1, c + 1)
-                a3 = game_map.get_corner_altitude(r + 1, c)
-                
-                # Vérifier si c'est de l'eau (tous les coins à 0 ou presque)
-                if a0 == 0 and a1 == 0 and a2 == 0 and a3 == 0:
-                    color = (0, 0, 200) # Bleu pour l'eau
-                else:
-                    # Calcul du relief (pente) en comparant les altitudes opposées
-                    # La lumière vient généralement du haut/gauche dans les jeux isométriques
-                    slope = (a2 - a0) + (a1 - a3)
-                    
-                    if slope > 0:
-                        color = (120, 200, 0)  # Vert clair (Pente éclairée)
-                    elif slope < 0:
-                        color = (0, 90, 0)     # Vert foncé (Pente ombragée)
-                    else:
-                        color = (0, 150, 0)    # Vert moyen (Plat)
-                
-                # Projection isométrique minimale (64 de décalage X de base, moité pour Y)
-                px = self.x + c + 64 - r
-                py = self.y + (c + r) // 2
-                
-                # Dessiner le pixel (___pixel)
-                surface.set_at((px, py), color)
+        # Le relief est mis en cache et ne se redessine que sur les TerrainEvent reçus
+        if game_map is not self._map:
+            self._attach(game_map)
+        for block in self._dirty:
+            self._render_terrain(game_map, *block)
+        self._dirty.clear()
+        surface.blit(self._terrain, (self.x, self.y))
 
         # Dessiner les maisons (Allies: Blanc, Foes: Gris sombre #666666)
         if blink:
             for house in game_map.houses:
                 r, c = house.r, house.c
-                px = self.x + c + 64 - r
+                px = self.x + c + self.offset - r
                 py = self.y + (c + r) // 2
                 
                 # Couleur selon l'équipe : Blanc pour alliés, #666666 pour foes
@@ -67,8 +102,8 @@ class Minimap:
         if blink:
             for peep in peeps:
                 r_int, c_int = int(peep.y), int(peep.x)
-                if 0 <= r_int < GRID_HEIGHT and 0 <= c_int < GRID_WIDTH:
-                    px = self.x + c_int + 64 - r_int
+                if 0 <= r_int < self.grid_height and 0 <= c_int < self.grid_width:
+                    px = self.x + c_int + self.offset - r_int
                     py = self.y + (c_int + r_int) // 2
                     
                     # Couleur selon l'équipe
@@ -76,15 +111,16 @@ class Minimap:
                     color = BLUE if team == 'allies' else RED
                     surface.set_at((px, py), color)
 
-        # Dessiner le losange / focus de la caméra (vue de 8x8 tuiles)
+        # Dessiner le losange / focus de la caméra (vue de view_size x view_size tuiles)
         r_cam = int(camera.r)
         c_cam = int(camera.c)
-        s = 8  # taille de la vue couverte
+        s = self.view_size  # taille de la vue couverte
+        o = self.offset
         
-        p1 = (self.x + c_cam + 64 - r_cam, self.y + (c_cam + r_cam) // 2)                         # Haut
-        p2 = (self.x + (c_cam + s) + 64 - r_cam, self.y + ((c_cam + s) + r_cam) // 2)             # Droite
-        p3 = (self.x + (c_cam + s) + 64 - (r_cam + s), self.y + ((c_cam + s) + (r_cam + s)) // 2) # Bas
-        p4 = (self.x + c_cam + 64 - (r_cam + s), self.y + (c_cam + (r_cam + s)) // 2)             # Gauche
+        p1 = (self.x + c_cam + o - r_cam, self.y + (c_cam + r_cam) // 2)                         # Haut
+        p2 = (self.x + (c_cam + s) + o - r_cam, self.y + ((c_cam + s) + r_cam) // 2)             # Droite
+        p3 = (self.x + (c_cam + s) + o - (r_cam + s), self.y + ((c_cam + s) + (r_cam + s)) // 2) # Bas
+        p4 = (self.x + c_cam + o - (r_cam + s), self.y + (c_cam + (r_cam + s)) // 2)             # Gauche
         
         pygame.draw.polygon(surface, WHITE, [p1, p2, p3, p4], 1)
 
@@ -103,18 +139,19 @@ class Minimap:
             # X_pixel = (c + 64) - r => c - r = X_pixel - 64
             # => 2c = 2 * Y_pixel + X_pixel - 64 => c = Y_pixel + (X_pixel - 64) / 2
             # => 2r = 2 * Y_pixel - (X_pixel - 64) => r = Y_pixel - (X_pixel - 64) / 2
+            # (64 = self.offset)
             
-            c = rel_y + (rel_x - 64) / 2
-            r = rel_y - (rel_x - 64) / 2
+            c = rel_y + (rel_x - self.offset) / 2
+            r = rel_y - (rel_x - self.offset) / 2
             
-            # Excentrer de 4 tuiles (moitié de la vue 8x8) pour centrer le clic
-            c -= 4
-            r -= 4
+            # Excentrer de la moitié de la vue (4 tuiles pour 8x8) pour centrer le clic
+            c -= self.view_size // 2
+            r -= self.view_size // 2
             
             # "La vue principale du joueur couvre un bloc de 8x8... bride le décalage à 56"
-            # clamp entries
-            c = max(0, min(56, int(c)))
-            r = max(0, min(56, int(r)))
+            # clamp entries (taille de la grille - taille de la vue)
+            c = max(0, min(self.grid_width - self.view_size, int(c)))
+            r = max(0, min(self.grid_height - self.view_size, int(r)))
             
             # Mise à jour de la caméra
             camera.c = float(c)
@@ -2,6 +2,7 @@ import pygame
 import numpy as np
 import random
 import math
+from render_batch import target_surface
 from settings import *
 
 SPRITE_EXTRACT_SIZE = 16  # Taille dans le spritesheet source
@@ -251,27 +252,12 @@ class Peep:
             # go_build : exploration pour trouver de nouvelles opportunités
             directions = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
             
-            # --- Scan local pour opportunité immédiate d'urbanisation ---
-            # Si on détecte du terrain plat VIERGE à côté, on interrompt le voyage.
-            # Si on détecte du terrain plat VIERGE à côté, on interrompt le voyage.
-            best_local_score = -1
-            best_local_tile = None
-            
-            for dr, dc in directions:
-                nr, nc = r0 + dr, c0 + dc
-                if 0 <= nr < self.game_map.grid_height and 0 <= nc < self.game_map.grid_width:
-                    if self.game_map.get_corner_altitude(nr, nc) > 0 and (nr, nc) not in self.path_history:
-                        score, _ = self.game_map.get_flat_area_score(nr, nc, current_house=None)
-                        if score > 5: # Seuil d'intérêt : s'il y a au moins un peu de plat
-                            # Vérifier si c'est déjà trop proche d'une maison
-                            too_close = False
-                            for h in self.game_map.houses:
-                                if max(abs(h.r - nr), abs(h.c - nc)) < 3: # Distance Chebyshev
-                                    too_close = True
-                                    break
-                            if not too_close and score > best_local_score:
-                                best_local_score = score
-                                best_local_tile = (nr, nc)
+            # --- Opportunité immédiate d'urbanisation ---
+            # Si un site constructible (index des sites de la carte) est voisin, on interrompt le voyage.
+            # Seuil d'intérêt : score > 5, s'il y a au moins un peu de plat autour.
+            best_local_tile = self.game_map.best_site_near(
+                r0, c0, 1, min_score=6, exclude=set(self.path_history) | {(r0, c0)}
+            )
             
             if best_local_tile:
                 # On réinitialise un momentum court vers cette opportunité
@@ -312,8 +298,7 @@ class Peep:
                 # Biais stratégique : on combine le score de platitude avec un "sens de l'espace"
                 # On préfère aller vers des cases qui ne sont pas DÉJÀ occupées par des maisons
                 scored_exploratory = []
-                for v in exploratory:
-                    score, _ = self.game_map.get_flat_area_score(v[0], v[1], current_house=None)
+                for v, score in zip(exploratory, self.game_map.get_flat_scores(exploratory)):
                     
                     # Bonus d'exploration : si la case est loin des maisons existantes, on augmente le poids
                     house_proximity_penalty = 0
@@ -365,10 +350,15 @@ class Peep:
                     # magnet to enemy peep OR enemy house
                     target = None
                     min_dist = float('inf')
+                    # Les ennemis d'une autre île sont inaccessibles à pied : ignorés
+                    # (sauf si le peep n'est lui-même sur aucune terre)
+                    home = self.game_map.landmass_id(r0, c0)
                     if hasattr(self.game_map, 'peeps'):
                         # Chercher le peep ennemi le plus proche
                         for other in self.game_map.peeps:
                             if not other.dead and other.team != self.team:
+                                if home and self.game_map.landmass_id(int(other.y), int(other.x)) != home:
+                                    continue
                                 dist = math.hypot(other.x - self.x, other.y - self.y)
                                 if dist < min_dist:
                                     min_dist = dist
@@ -377,6 +367,8 @@ class Peep:
                         # Chercher aussi le bâtiment ennemi le plus proche
                         for house in self.game_map.houses:
                             if not house.destroyed and house.team != self.team:
+                                if home and self.game_map.landmass_id(house.r, house.c) != home:
+                                    continue
                                 # Distance au centre du bâtiment
                                 dist = math.hypot(house.c + 0.5 - self.x, house.r + 0.5 - self.y)
                                 if dist < min_dist:
@@ -603,7 +595,7 @@ class Peep:
             on_water = (a0 == 0 and a1 == 0 and a2 == 0 and a3 == 0)
             
             # --- DÉTECTION SWAMP ---
-            if (gr_cur, gc_cur) in self.game_map.swamps and not self.dead:
+            if self.game_map.is_swamp(gr_cur, gc_cur) and not self.dead:
                 self.dead = True
                 self.death_timer = 0
                 self.just_swamped = (gr_cur, gc_cur) # On stocke la position de la noyade
@@ -650,8 +642,8 @@ class Peep:
                 # Condition : état WANDER et on n'est pas sur l'eau
                 if self.state == Peep.STATE_WANDER:
                     gr, gc = int(self.y), int(self.x)
-                    for h in self.game_map.houses:
-                        if not h.destroyed and (gr, gc) in h.occupied_tiles:
+                    for h in self.game_map.get_tile_owners(gr, gc):
+                        if not h.destroyed:
                             if h.team == self.team:
                                 # Entrer dans le bâtiment : on ajoute notre vie au bâtiment
                                 h.life = min(h.max_life, h.life + self.life)
@@ -777,7 +769,7 @@ class Peep:
 
         # On réduit le timer de build pour plus de réactivité si on est sur une bonne case
         gr, gc = int(self.y), int(self.x)
-        score_normal, _ = self.game_map.get_flat_area_score(gr, gc, current_house=None, is_castle=False)
+        score_normal = self.game_map.get_flat_score(gr, gc, is_castle=False)
         
         # Si on est sur une case constructible, on build plus vite (2s au lieu de 5s)
         effective_build_limit = 2.0 if score_normal >= 0 else 5.0
@@ -792,7 +784,7 @@ class Peep:
         # 2. On regarde pour les maisons normales (zone influence 16 cases)
         score_normal, valid_tiles_normal = self.game_map.get_flat_area_score(gr, gc, current_house=None, is_castle=False)
         
-        house_present = any((gr, gc) in getattr(h, 'occupied_tiles', [(h.r, h.c)]) for h in self.game_map.houses)
+        house_present = bool(self.game_map.get_tile_owners(gr, gc))
         
         from house import House
         thresholds = [0, 1, 3, 5, 7, 9, 11, 12, 14, 16]
@@ -844,7 +836,7 @@ class Peep:
                     nr, nc = gr + dr, gc + dc
                     if 0 <= nr < self.game_map.grid_height and 0 <= nc < self.game_map.grid_width:
                         alt = self.game_map.get_corner_altitude(nr, nc)
-                        occupied = any((nr, nc) in getattr(h, 'occupied_tiles', []) for h in self.game_map.houses)
+                        occupied = bool(self.game_map.get_tile_owners(nr, nc))
                         if alt > 0 and not occupied:
                             from peep import Peep
                             new_peep = Peep(nr, nc, self.game_map, team=self.team)
@@ -948,7 +940,7 @@ class Peep:
                 surface.blit(life_text, (text_x, text_y))
         else:
             # Fallback : petit cercle
-            pygame.draw.circle(surface, (255, 220, 120), (sx, ground_y), 3)
+            pygame.draw.circle(target_surface(surface), (255, 220, 120), (sx, ground_y), 3)
             if show_debug and debug_font is not None:
                 color = (255, 0, 0) if self.team == 'foes' else (255, 255, 0)
                 life_text = debug_font.render(f"{int(self.life)}", True, color)
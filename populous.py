@@ -2,6 +2,7 @@ import json
 import math
 import os
 import random
+import sys
 import time
 
 import pygame
@@ -16,6 +17,8 @@ from game_map import GameMap
 from house import House
 from minimap import Minimap
 from peep import Peep
+from render_batch import RenderBatch
+from terrain_layer import TerrainLayer, TerrainAtlas
 from settings import *
 
 class BitmapFont:
@@ -73,7 +76,13 @@ class Game:
     def move_camera_direction(self, direction):
         # Déplace la caméra selon la direction
         self.camera.move_direction(direction)
-    def __init__(self):
+    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, map_key=None, map_style='default'):
+        # Taille du monde (en tuiles), transmise à la carte, à la caméra et à la minimap
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        # Clé de carte (voir map_generator) : None = carte aléatoire
+        self.map_key = map_key
+        self.map_style = map_style
         # --- Scroll continu D-Pad ---
         self.dpad_held_direction = None
         self.dpad_held_timer = 0.0
@@ -82,8 +91,8 @@ class Game:
         self.papal_mode = False
         # Ralliement papal pour chaque faction
         self.papal_position = {
-            'allies': (GRID_HEIGHT // 2, GRID_WIDTH // 2),
-            'foes': (GRID_HEIGHT // 2, GRID_WIDTH // 2)
+            'allies': (grid_height // 2, grid_width // 2),
+            'foes': (grid_height // 2, grid_width // 2)
         }
         self.shield_mode = False  # Mode blason/shield
         self.volcano_mode = False # Mode volcan
@@ -142,12 +151,19 @@ class Game:
             mod.SPRITE_SIZE = SPRITE_SIZE
             mod.ALTITUDE_PIXEL_STEP = ALTITUDE_PIXEL_STEP
 
-        self.camera = Camera()
+        self.camera = Camera(grid_width, grid_height, VIEW_SIZE)
         self.peeps = []
-        self.game_map = GameMap(GRID_WIDTH, GRID_HEIGHT)
+        self.game_map = GameMap(grid_width, grid_height, VIEW_SIZE)
         self.game_map.peeps = self.peeps
-        self.game_map.randomize()
-        self.minimap = Minimap(0, 0) # Position de la minimap
+        self.new_map()
+        self.minimap = Minimap(0, 0, grid_width, grid_height, VIEW_SIZE) # Position de la minimap
+        # Terrain de la vue principale en cache, redessiné seulement là où il change
+        if TERRAIN_ATLAS and grid_width * grid_height <= TERRAIN_ATLAS_MAX_TILES:
+            self.terrain_layer = TerrainAtlas()
+        else:
+            self.terrain_layer = TerrainLayer()
+        # Appels de dessin et sprites de la vue à la dernière frame (voir RenderBatch)
+        self.render_stats = (0, 0)
         self.sound = Sound()
 
         # --- Chargement des sprites d'armes ---
@@ -601,11 +617,36 @@ class Game:
             pygame.draw.line(self.scanline_surface, (0, 0, 0, 100), (0, y), (w, y), 1)
 
 
+    def new_map(self):
+        """Carte générée depuis la clé si elle est fixée, sinon aléatoire."""
+        if self.map_key is None:
+            self.game_map.randomize()
+        else:
+            self.game_map.generate(self.map_key, style=self.map_style)
+
+    def save_map_image(self):
+        """Capture PNG du terrain de toute la carte, tirée de l'atlas."""
+        atlas = self.terrain_layer if isinstance(self.terrain_layer, TerrainAtlas) else TerrainAtlas()
+        path = os.path.join(BASE_DIR, time.strftime("map_%Y%m%d_%H%M%S.png"))
+        pygame.image.save(atlas.image(self.game_map), path)
+        if atlas is not self.terrain_layer:
+            atlas.detach()
+        print(f"Carte enregistrée : {path}")
+
     def spawn_initial_peeps(self, count):
+        # Carte générée : chaque équipe part de ses positions de départ
+        if self.game_map.start_positions:
+            for team, cells in self.game_map.start_positions.items():
+                for i in range(count // 2):
+                    r, c = cells[i % len(cells)] if cells else (self.grid_height // 2, self.grid_width // 2)
+                    peep = Peep(r, c, self.game_map, team=team)
+                    peep.set_command('_go_build')
+                    self.peeps.append(peep)
+            return
         # Spawn initial d'allies (bleus)
         for _ in range(count // 2):
-            r = random.randint(0, GRID_HEIGHT - 1)
-            c = random.randint(0, GRID_WIDTH - 1)
+            r = random.randint(0, self.grid_height - 1)
+            c = random.randint(0, self.grid_width - 1)
             # Ne pas spawn sur l'eau
             if self.game_map.get_corner_altitude(r, c) > 0:
                 peep = Peep(r, c, self.game_map, team='allies')
@@ -614,8 +655,8 @@ class Game:
 
         # Spawn initial de foes (rouges)
         for _ in range(count // 2):
-            r = random.randint(0, GRID_HEIGHT - 1)
-            c = random.randint(0, GRID_WIDTH - 1)
+            r = random.randint(0, self.grid_height - 1)
+            c = random.randint(0, self.grid_width - 1)
             # Ne pas spawn sur l'eau
             if self.game_map.get_corner_altitude(r, c) > 0:
                 peep = Peep(r, c, self.game_map, team='foes')
@@ -739,9 +780,9 @@ class Game:
             cost = self.POWER_COSTS['_do_volcano']
             if self.power_jauge['allies'] >= cost:
                 self.power_jauge['allies'] -= cost
-                # Le centre de la vue actuelle (8x8) est à cam.r + 4, cam.c + 4
-                target_r = int(self.camera.r + 4)
-                target_c = int(self.camera.c + 4)
+                # Le centre de la vue actuelle (VIEW_SIZE x VIEW_SIZE) est à cam.r + VIEW_SIZE // 2, cam.c + VIEW_SIZE // 2
+                target_r = int(self.camera.r + VIEW_SIZE // 2)
+                target_c = int(self.camera.c + VIEW_SIZE // 2)
                 self.game_map.do_volcano(target_r, target_c)
                 self.sound.play_sound('do_volcano')
                 print(f"Volcan lancé au centre de la vue ({target_r}, {target_c})")
@@ -781,7 +822,7 @@ class Game:
                     self.peeps.append(p)
                     h.destroyed = True
                 
-                self.game_map.houses.clear()
+                self.game_map.clear_houses()
                 
                 # Tous les peeps alliés et ennemis vont au centre
                 center_r = self.game_map.grid_height // 2
@@ -805,7 +846,7 @@ class Game:
                 self.power_jauge['allies'] -= cost
                 # Déclenche l'effet visuel et le son
                 self.quake_timer = 2.0
-                self.quake_target = (int(self.camera.r + 4), int(self.camera.c + 4))
+                self.quake_target = (int(self.camera.r + VIEW_SIZE // 2), int(self.camera.c + VIEW_SIZE // 2))
                 self.sound.play_sound('do_quake')
                 print("Tremblement de terre lancé ! Secousse en cours...")
                 # Retour au mode sélectionné
@@ -816,7 +857,7 @@ class Game:
             cost = self.POWER_COSTS['_do_swamp']
             if self.power_jauge['allies'] >= cost:
                 self.power_jauge['allies'] -= cost
-                target_r, target_c = int(self.camera.r + 4), int(self.camera.c + 4)
+                target_r, target_c = int(self.camera.r + VIEW_SIZE // 2), int(self.camera.c + VIEW_SIZE // 2)
                 self.game_map.do_swamp(target_r, target_c)
                 self.sound.play_sound('swamp')
                 print(f"Marécage lancé au centre de la vue ({target_r}, {target_c})")
@@ -1081,15 +1122,17 @@ class Game:
                 elif event.key == pygame.K_F1:
                     self.peeps.clear()
                 elif event.key == pygame.K_F2:
-                    self.game_map.houses.clear()
+                    self.game_map.clear_houses()
                 elif event.key == pygame.K_F3:
                     self.peeps.clear()
-                    self.game_map.houses.clear()
-                    self.game_map.randomize()
+                    self.game_map.clear_houses()
+                    self.new_map()
                     self.spawn_initial_peeps(10)
                 elif event.key == pygame.K_F4:
                     self.game_map.set_all_altitude(1)
-                    self.game_map.swamps.clear()
+                    self.game_map.clear_swamps()
+                elif event.key == pygame.K_F5:
+                    self.save_map_image()
                 elif event.key == pygame.K_F12:
                     self.show_scanlines = not self.show_scanlines
                 elif event.unicode == '§':
@@ -1150,7 +1193,7 @@ class Game:
                     r, c = self.game_map.screen_to_nearest_corner(
                         vp_x, vp_y, self.camera.r, self.camera.c
                     )
-                    # On vérifie qu'on clique bien sur la zone 8x8 visible de la caméra
+                    # On vérifie qu'on clique bien sur la zone visible de la caméra (VIEW_SIZE x VIEW_SIZE)
                     start_r, end_r, start_c, end_c = self.game_map.get_visible_bounds(self.camera.r, self.camera.c)
                     if start_r <= r <= end_r and start_c <= c <= end_c:
                         if self.papal_mode:
@@ -1175,19 +1218,21 @@ class Game:
                             return
                         elif not self.papal_mode and not self.shield_mode and not self.volcano_mode:
                             if event.button == 1:
-                                cost = self.game_map.get_raise_cost(r, c)
+                                plan = self.game_map.plan_raise(r, c)
+                                cost = plan.cost
                                 if cost > 0:
                                     if self.power_jauge['allies'] >= cost:
                                         self.power_jauge['allies'] -= cost
-                                        self.game_map.raise_corner(r, c)
+                                        self.game_map.apply_plan(plan)
                                     else:
                                         print(f"Pas assez de power pour raise_terrain ! (coût: {cost})")
                             elif event.button == 3:
-                                cost = self.game_map.get_lower_cost(r, c)
+                                plan = self.game_map.plan_lower(r, c)
+                                cost = plan.cost
                                 if cost > 0:
                                     if self.power_jauge['allies'] >= cost:
                                         self.power_jauge['allies'] -= cost
-                                        self.game_map.lower_corner(r, c)
+                                        self.game_map.apply_plan(plan)
                                     else:
                                         print(f"Pas assez de power pour lower_terrain ! (coût: {cost})")
             elif event.type == pygame.MOUSEBUTTONUP:
@@ -1409,8 +1454,8 @@ class Game:
                 # Un peep en WANDER, FIGHT ou PAPAL qui touche un bâtiment adverse lance un combat
                 if peep.state in ('wander', 'fight', 'papal'):
                     gr, gc = int(peep.y), int(peep.x)
-                    for h in self.game_map.houses:
-                        if not h.destroyed and (gr, gc) in h.occupied_tiles and h.team != peep.team:
+                    for h in self.game_map.get_tile_owners(gr, gc):
+                        if not h.destroyed and h.team != peep.team:
                             # Combat : on simule un échange de vie
                             # On utilise une vitesse de combat (ex: 20 pts/sec)
                             combat_damage = dt * 20.0
@@ -1422,7 +1467,7 @@ class Game:
                             
                             # Si le bâtiment arrive à 0, il est converti
                             if h.life <= 0:
-                                h.team = peep.team
+                                self.game_map.set_house_team(h, peep.team)
                                 h.life = max(1.0, peep.life * 0.5) # Le bâtiment redémarre avec une fraction de la vie du conquérant
                                 if peep_had_shield:
                                     h.has_shield = True
@@ -1467,7 +1512,7 @@ class Game:
 
         # Maisons : update et spawn de peeps
         new_peeps = []
-        houses_to_keep = []
+        destroyed_houses = []
         for house in self.game_map.houses:
             house.update(dt, self.game_map)
             
@@ -1476,13 +1521,14 @@ class Game:
                 p = self._spawn_peep_from_house(house)
                 p.life = house.life # Garde la vie actuelle si destruction
                 new_peeps.append(p)
+                destroyed_houses.append(house)
             else:
-                houses_to_keep.append(house)
                 if house.can_spawn_peep():
                     new_peeps.append(self._spawn_peep_from_house(house))
                     house.life = 1.0
                     
-        self.game_map.houses = houses_to_keep
+        for house in destroyed_houses:
+            self.game_map.remove_house(house)
         self.peeps.extend(new_peeps)
 
         # Garder la sélection valide si la cible existe encore.
@@ -1514,19 +1560,23 @@ class Game:
         cam_r, cam_c = self.camera.r, self.camera.c
         offset_y = getattr(self, 'quake_shake_y', 0)
 
+        # Sprites de la vue (terrain, maisons, papal, peeps, marqueurs) collectés puis blittés
+        # en un seul Surface.blits() ; les dessins directs passent par batch.target()
+        batch = RenderBatch(self.internal_surface)
+
         # Terrain
-        self.game_map.draw(self.internal_surface, cam_r, cam_c, offset_y=offset_y)
+        self.terrain_layer.draw(batch, self.game_map, cam_r, cam_c, offset_y=offset_y)
 
         # Maisons
         debug_font = pygame.font.SysFont("consolas", 14, bold=True) if self.show_debug else None
-        self.game_map.draw_houses(self.internal_surface, cam_r, cam_c, show_debug=self.show_debug, debug_font=debug_font, offset_y=offset_y)
+        self.game_map.draw_houses(batch, cam_r, cam_c, show_debug=self.show_debug, debug_font=debug_font, offset_y=offset_y)
         
         # Dessiner le shield sur les maisons qui le possèdent
         for house in self.game_map.houses:
             if not getattr(house, 'destroyed', False) and getattr(house, 'has_shield', False):
-                self._draw_shield_marker(self.internal_surface, house, 'house', cam_r, cam_c, offset_y=offset_y)
+                self._draw_shield_marker(batch, house, 'house', cam_r, cam_c, offset_y=offset_y)
             if not getattr(house, 'destroyed', False) and getattr(house, 'has_leader', False):
-                self._draw_leader_marker(self.internal_surface, house, 'house', house.team, cam_r, cam_c, offset_y=offset_y)
+                self._draw_leader_marker(batch, house, 'house', house.team, cam_r, cam_c, offset_y=offset_y)
 
         start_r, end_r, start_c, end_c = self.game_map.get_visible_bounds(cam_r, cam_c)
 
@@ -1543,17 +1593,17 @@ class Game:
                         sx, sy = self.game_map.world_to_screen(r, c, alt, cam_r, cam_c)
                         blit_x = sx - TILE_HALF_W
                         blit_y = sy + offset_y
-                        self.internal_surface.blit(papal_tile, (blit_x, blit_y))
+                        batch.blit(papal_tile, (blit_x, blit_y))
 
         for peep in self.peeps:
             if peep.y < start_r or peep.y >= end_r or peep.x < start_c or peep.x >= end_c:
                 continue
-            peep.draw(self.internal_surface, cam_r, cam_c, show_debug=self.show_debug, debug_font=debug_font, offset_y=offset_y)
+            peep.draw(batch, cam_r, cam_c, show_debug=self.show_debug, debug_font=debug_font, offset_y=offset_y)
             # Affiche le shield automatique si le peep l'a (même s'il n'est pas sélectionné)
             if getattr(peep, 'has_shield', False) and not peep.dead:
-                self._draw_shield_marker(self.internal_surface, peep, 'peep', cam_r, cam_c, offset_y=offset_y)
+                self._draw_shield_marker(batch, peep, 'peep', cam_r, cam_c, offset_y=offset_y)
             if getattr(peep, 'is_leader', False) and not peep.dead:
-                self._draw_leader_marker(self.internal_surface, peep, 'peep', peep.team, cam_r, cam_c, offset_y=offset_y)
+                self._draw_leader_marker(batch, peep, 'peep', peep.team, cam_r, cam_c, offset_y=offset_y)
 
         if self.view_who is not None and self.view_type is not None:
             r = getattr(self.view_who, 'y', getattr(self.view_who, 'r', -1))
@@ -1561,10 +1611,10 @@ class Game:
             if start_r <= r < end_r and start_c <= c < end_c:
                 # Outil de sélection : on utilise le shield comme curseur sur entité, mais on ne veut pas 
                 # qu'il masque un sprite de leader. On trace le shield, puis le leader.
-                self._draw_shield_marker(self.internal_surface, self.view_who, self.view_type, cam_r, cam_c, offset_y=offset_y)
+                self._draw_shield_marker(batch, self.view_who, self.view_type, cam_r, cam_c, offset_y=offset_y)
                 team = getattr(self.view_who, 'team', 'allies')
                 if getattr(self.view_who, 'is_leader', getattr(self.view_who, 'has_leader', False)):
-                    self._draw_leader_marker(self.internal_surface, self.view_who, self.view_type, team, cam_r, cam_c, offset_y=offset_y)
+                    self._draw_leader_marker(batch, self.view_who, self.view_type, team, cam_r, cam_c, offset_y=offset_y)
 
         mouse_x, mouse_y = pygame.mouse.get_pos()
         mouse_x //= self.display_scale
@@ -1583,10 +1633,12 @@ class Game:
                 pointer_sprite = sprites.get((8, 11))
                 if pointer_sprite:
                     sprite_rect = pointer_sprite.get_rect(center=(px + 5, py + TILE_HALF_H + 4))
-                    self.internal_surface.blit(pointer_sprite, sprite_rect)
+                    batch.blit(pointer_sprite, sprite_rect)
                 else:
-                    pygame.draw.circle(self.internal_surface, RED, (px, py + TILE_HALF_H), 3)
+                    pygame.draw.circle(batch.target(), RED, (px, py + TILE_HALF_H), 3)
 
+        batch.flush()
+        self.render_stats = (batch.call_count, batch.sprite_count)
 
         self.minimap.draw(self.internal_surface, self.game_map, self.camera, self.peeps)
 
@@ -1670,6 +1722,7 @@ class Game:
             cam_r, cam_c = self.camera.r, self.camera.c
 
             alt_text = "N/A"
+            cost_text = "N/A"
             grid_r, grid_c = -1, -1
             if self.view_rect.collidepoint(mouse_x, mouse_y):
                 vp_x = mouse_x - self.view_rect.x
@@ -1680,15 +1733,23 @@ class Game:
                 alt = self.game_map.get_corner_altitude(grid_r, grid_c)
                 if alt != -1:
                     alt_text = str(alt)
+                # Aperçu du coût au survol, lu dans le champ de coûts de la vue visible
+                start_r, end_r, start_c, end_c = self.game_map.get_visible_bounds(cam_r, cam_c)
+                if start_r <= grid_r <= end_r and start_c <= grid_c <= end_c:
+                    raise_costs, lower_costs = self.game_map.get_cost_field(start_r, end_r + 1, start_c, end_c + 1)
+                    lr, lc = grid_r - start_r, grid_c - start_c
+                    cost_text = f"raise {raise_costs[lr, lc]} / lower {lower_costs[lr, lc]}"
 
             debug_texts = [
                 f"FPS: {self.clock.get_fps():.1f}",
                 f"Scale: x{self.display_scale}",
                 f"Mouse: ({mouse_x}, {mouse_y})",
                 f"Corner: ({grid_r}, {grid_c}) Alt: {alt_text}",
+                f"Cost: {cost_text}",
                 f"Camera R/C: ({cam_r:.2f}, {cam_c:.2f})",
                 f"Peeps: {len(self.peeps)}",
                 f"Houses: {len(self.game_map.houses)}",
+                f"Draw calls: {self.render_stats[0]} ({self.render_stats[1]} sprites)",
                 f"Powerjauge {int(self.power_jauge['allies'])} (allies) / {int(self.power_jauge['foes'])} (foes)"
             ]
             bold_font = pygame.font.SysFont("consolas", 16, bold=True)
@@ -1703,7 +1764,9 @@ class Game:
 
 if __name__ == '__main__':
     try:
-        game = Game()
+        # Clé de carte optionnelle : python populous.py CLE [style]
+        args = sys.argv[1:]
+        game = Game(map_key=args[0] if args else None, map_style=args[1] if len(args) > 1 else 'default')
         game.run()
     except Exception as e:
         import traceback
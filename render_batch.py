@@ -0,0 +1,42 @@
+class RenderBatch:
+    """
+    File de blits d'une frame, envoyée à la surface cible en un seul appel à Surface.blits(),
+    dans l'ordre de soumission (ordre du peintre).
+    S'utilise à la place de la surface : blit() et blits() ont la signature de pygame.Surface
+    (sans la valeur de retour). Un dessin direct sur la cible (pygame.draw, fill...) passe
+    par target(), qui vide d'abord la file pour garder l'ordre.
+    """
+
+    def __init__(self, surface):
+        self._surface = surface
+        self._commands = []
+        self.sprite_count = 0  # blits soumis
+        self.call_count = 0    # appels effectifs à la cible (blits, puis dessins directs)
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        if area is None and not special_flags:
+            self._commands.append((source, dest))
+        else:
+            self._commands.append((source, dest, area, special_flags))
+
+    def blits(self, blit_sequence, doreturn=False):
+        self._commands.extend(blit_sequence)
+
+    def flush(self):
+        """Envoie les blits en attente à la cible."""
+        if self._commands:
+            self.sprite_count += len(self._commands)
+            self.call_count += 1
+            self._surface.blits(self._commands, doreturn=False)
+            self._commands = []
+
+    def target(self):
+        """Surface cible, à jour, pour un dessin direct."""
+        self.flush()
+        self.call_count += 1
+        return self._surface
+
+
+def target_surface(surface):
+    """Surface réelle derrière `surface` (RenderBatch ou pygame.Surface)."""
+    return surface.target() if isinstance(surface, RenderBatch) else surface
@@ -24,6 +24,14 @@ BROWN = (139, 69, 19)
 # === Grille ===
 GRID_WIDTH = 64
 GRID_HEIGHT = 64
+# Côté (en tuiles) de la vue principale
+VIEW_SIZE = 8
+
+# === Rendu ===
+# Vue principale découpée dans une image de toute la carte (terrain_layer.TerrainAtlas)
+# au lieu d'une couche limitée à la vue ; seulement jusqu'à TERRAIN_ATLAS_MAX_TILES tuiles
+TERRAIN_ATLAS = False
+TERRAIN_ATLAS_MAX_TILES = 128 * 128
 
 # === Altitude ===
 ALTITUDE_MIN = 0
@@ -0,0 +1,387 @@
+import pygame
+import numpy as np
+from game_map import (TerrainEvent, TERRAIN_TILE_KEYS, TERRAIN_TILE_IDS, ROCK_TILE_KEYS, RAISED_TILE_KEYS,
+                      TILE_ID_WATER, TILE_ID_WATER_2)
+from render_batch import RenderBatch
+from settings import ALTITUDE_MAX, TILE_WIDTH, TILE_HEIGHT, TILE_HALF_W, TILE_HALF_H, TILE_WATER, TILE_WATER_2
+
+
+def _frame_key(tile_key, frame):
+    """Sprite de la tile pour la frame `frame` de l'eau (seule l'eau est animée)."""
+    if tile_key == TILE_WATER or tile_key == TILE_WATER_2:
+        return TILE_WATER_2 if frame else TILE_WATER
+    return tile_key
+
+
+def _frame0_ids(tile_ids):
+    """Identifiants de tiles ramenés à la frame 0 de l'eau."""
+    return np.where(tile_ids == TILE_ID_WATER_2, TILE_ID_WATER, tile_ids)
+
+
+class TerrainLayer:
+    """
+    Terrain de la vue principale rendu hors écran, dans une surface juste assez grande
+    pour la vue (voir tiles_rect).
+    Seules les tuiles signalées par les TerrainEvent de la GameMap sont redessinées ;
+    un déplacement de caméra refait toute la vue.
+    Les deux frames de l'eau sont gardées rendues : l'animation ne fait qu'échanger les
+    surfaces. La frame 1 est une copie de la frame 0 où seules les tuiles autour de l'eau
+    sont redessinées. Une frame sans changement coûte un seul blit.
+    """
+    TRANSPARENT = (0, 0, 0, 0)
+
+    def __init__(self):
+        self._surfaces = [None, None]  # rendu par frame de l'eau (0 / 1)
+        self._origin = (0, 0)  # position écran du coin haut gauche de la couche
+        self._map = None
+        self._key = None  # clé du rendu en cache (voir _cache_key)
+        self._cam = (0, 0)  # caméra utilisée pour le rendu
+        self._bounds = (0, 0, 0, 0)  # tuiles rendues (start_r, end_r, start_c, end_c)
+        self._dirty = []  # blocs de tuiles (r0, r1, c0, c1) à redessiner
+        self._territory_dirty = []  # blocs TERRITORY, redessinés si leurs tiles ont changé
+        self._ids = None  # identifiants des tuiles rendues (eau en frame 0), alignés sur _bounds
+        self._tiles = []  # tuiles rendues (r, c), dans l'ordre du peintre
+        self._tile_rects = []  # leur tiles_rect, en coordonnées de la couche
+        self._patch_count = 0  # nombre de rendus (complets ou partiels) : change avec l'image
+
+    def _attach(self, game_map):
+        self.detach()
+        self._map = game_map
+        game_map.subscribe(self._on_terrain_event)
+        self._key = None
+        self._dirty = []
+        self._territory_dirty = []
+
+    def detach(self):
+        """Arrête le suivi des TerrainEvent de la carte courante."""
+        if self._map is not None:
+            self._map.unsubscribe(self._on_terrain_event)
+            self._map = None
+
+    def _on_terrain_event(self, event):
+        if event.kind == TerrainEvent.TERRITORY:
+            # Le territoire ne change que l'identifiant de certaines tiles (constructions)
+            self._territory_dirty.append(event.rect)
+        else:
+            # Altitudes, rochers et marécages changent l'apparence des tuiles
+            self._dirty.append(event.rect)
+
+    def tiles_rect(self, game_map, r0, r1, c0, c1, cam_r, cam_c):
+        """
+        Rectangle écran couvrant tout ce que les tuiles [r0:r1, c0:c1] peuvent dessiner,
+        quelle que soit leur altitude (losange, faces latérales jusqu'au niveau 0, rochers).
+        """
+        left, _ = game_map.world_to_screen(r1, c0, 0, cam_r, cam_c)
+        right, _ = game_map.world_to_screen(r0, c1, 0, cam_r, cam_c)
+        _, top = game_map.world_to_screen(r0, c0, ALTITUDE_MAX, cam_r, cam_c)
+        _, bottom = game_map.world_to_screen(r1 - 1, c1 - 1, 0, cam_r, cam_c)
+        # Une tile plate au niveau 0 est décalée d'un demi-losange vers le bas
+        bottom += TILE_HALF_H + TILE_HEIGHT
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def view_rect(self, game_map, cam_r, cam_c):
+        """tiles_rect de la vue complète (view_size x view_size tuiles) depuis la caméra."""
+        r, c = int(cam_r), int(cam_c)
+        return self.tiles_rect(game_map, r, r + game_map.view_size, c, c + game_map.view_size, cam_r, cam_c)
+
+    def _cache_key(self, game_map, cam_r, cam_c):
+        return cam_r, cam_c
+
+    def _layout(self, game_map, cam_r, cam_c):
+        """Caméra de rendu, tuiles rendues et rectangle écran de la couche."""
+        return (cam_r, cam_c), game_map.get_visible_bounds(cam_r, cam_c), self.view_rect(game_map, cam_r, cam_c)
+
+    def refresh(self, game_map, cam_r=0, cam_c=0):
+        """Met le rendu en cache à jour (rendu complet ou tuiles signalées seulement)."""
+        if game_map is not self._map:
+            self._attach(game_map)
+        key = self._cache_key(game_map, cam_r, cam_c)
+        if key != self._key:
+            self._key = key
+            self._dirty = []
+            self._territory_dirty = []
+            self._resize(game_map, *self._layout(game_map, cam_r, cam_c))
+            self._render(game_map)
+        elif self._dirty or self._territory_dirty:
+            blocks = self._visible_blocks(self._dirty)
+            blocks += [block for block in self._visible_blocks(self._territory_dirty)
+                       if self._ids_changed(game_map, *block)]
+            self._dirty = []
+            self._territory_dirty = []
+            if not blocks:
+                return
+            if sum((r1 - r0) * (c1 - c0) for r0, r1, c0, c1 in blocks) >= len(self._tiles):
+                # Autant tout refaire d'un coup (flood, carte régénérée...)
+                self._render(game_map)
+                return
+            for block in blocks:
+                self._render(game_map, self.tiles_rect(game_map, *block, *self._cam))
+
+    def _visible_blocks(self, blocks):
+        """Intersections non vides des blocs de tuiles avec les tuiles rendues."""
+        start_r, end_r, start_c, end_c = self._bounds
+        visible = []
+        for r0, r1, c0, c1 in blocks:
+            # Une tuile hors du rendu ne dessine rien : seule l'intersection compte
+            r0, r1 = max(r0, start_r), min(r1, end_r)
+            c0, c1 = max(c0, start_c), min(c1, end_c)
+            if r0 < r1 and c0 < c1:
+                visible.append((r0, r1, c0, c1))
+        return visible
+
+    def _ids_changed(self, game_map, r0, r1, c0, c1):
+        """Les tiles du bloc diffèrent-elles de celles rendues ?"""
+        start_r, _, start_c, _ = self._bounds
+        ids = _frame0_ids(game_map.classify_tiles(r0, r1, c0, c1))
+        return not np.array_equal(ids, self._ids[r0 - start_r:r1 - start_r, c0 - start_c:c1 - start_c])
+
+    def draw(self, surface, game_map, cam_r, cam_c, offset_y=0):
+        self.refresh(game_map, cam_r, cam_c)
+        # Le décalage vertical (tremblement de terre) ne demande pas de nouveau rendu
+        surface.blit(self._surfaces[game_map.water_frame], (self._origin[0], self._origin[1] + offset_y))
+
+    def _resize(self, game_map, cam, bounds, rect):
+        self._cam = cam
+        self._bounds = bounds
+        self._origin = rect.topleft
+        for frame in (0, 1):
+            surface = self._surfaces[frame]
+            if surface is None or surface.get_size() != rect.size:
+                # Les tiles n'ont que des alphas 0 ou 255 : la composition via la couche
+                # donne exactement les pixels d'un dessin direct
+                self._surfaces[frame] = pygame.Surface(rect.size, pygame.SRCALPHA)
+        start_r, end_r, start_c, end_c = bounds
+        self._ids = np.zeros((end_r - start_r, end_c - start_c), dtype=np.uint8)
+        self._tiles = [(r, c) for r in range(start_r, end_r) for c in range(start_c, end_c)]
+        self._tile_rects = [self.tiles_rect(game_map, r, r + 1, c, c + 1, *cam).move(-rect.x, -rect.y)
+                            for r, c in self._tiles]
+
+    def _render(self, game_map, clip=None):
+        """
+        Redessine tout le rendu, ou seulement le rectangle écran `clip` : toutes les tuiles
+        qui le touchent sont redessinées dans l'ordre du peintre, pour garder les recouvrements.
+        """
+        ox, oy = self._origin
+        if clip is None:
+            indices = range(len(self._tiles))
+        else:
+            clip = clip.move(-ox, -oy)
+            indices = clip.collidelistall(self._tile_rects)
+        if not indices:
+            return
+        self._patch_count += 1
+        tiles = [self._tiles[i] for i in indices]
+        # Classification du seul bloc englobant les tuiles à redessiner
+        r0, r1 = tiles[0][0], tiles[-1][0] + 1
+        c0, c1 = min(t[1] for t in tiles), max(t[1] for t in tiles) + 1
+        tile_ids = game_map.classify_tiles(r0, r1, c0, c1)
+        start_r, _, start_c, _ = self._bounds
+        self._ids[r0 - start_r:r1 - start_r, c0 - start_c:c1 - start_c] = _frame0_ids(tile_ids)
+        self._draw_tiles(game_map, self._surfaces[0], tiles, tile_ids, r0, c0, clip, 0)
+
+        # Frame 1 : copie de la frame 0, puis seules les tuiles qui touchent une tile d'eau
+        # (rectangle englobant) sont redessinées avec l'autre sprite de l'eau
+        if clip is None:
+            area = self._surfaces[0].get_rect()
+            self._surfaces[1] = self._surfaces[0].copy()
+        else:
+            area = clip
+            self._surfaces[1].fill(self.TRANSPARENT, area)
+            self._surfaces[1].blit(self._surfaces[0], area, area)
+        water = [self._tile_rects[i] for i, (r, c) in zip(indices, tiles)
+                 if tile_ids.item(r - r0, c - c0) in (TILE_ID_WATER, TILE_ID_WATER_2)]
+        if water:
+            water_rect = water[0].unionall(water[1:]).clip(area)
+            # Sous-ensemble des tuiles de la zone : tile_ids les couvre déjà
+            around = [self._tiles[i] for i in water_rect.collidelistall(self._tile_rects)]
+            self._draw_tiles(game_map, self._surfaces[1], around, tile_ids, r0, c0, water_rect, 1)
+
+    def _draw_tiles(self, game_map, layer, tiles, tile_ids, r0, c0, clip, frame):
+        """Efface `clip` (tout si None) puis y dessine `tiles` avec la frame `frame` de l'eau."""
+        ox, oy = self._origin
+        cam_r, cam_c = self._cam
+        layer.set_clip(clip)
+        layer.fill(self.TRANSPARENT)
+        batch = RenderBatch(layer)
+        for r, c in tiles:
+            tile_key = _frame_key(TERRAIN_TILE_KEYS[tile_ids.item(r - r0, c - c0)], frame)
+            game_map.draw_tile(batch, r, c, cam_r, cam_c, offset_y=-oy, tile_key=tile_key, offset_x=-ox)
+        batch.flush()
+        layer.set_clip(None)
+
+
+# Tiles dessinées un demi-losange plus bas (voir GameMap.draw_tile)
+RAISED_TILE_IDS = [TERRAIN_TILE_IDS[key] for key in RAISED_TILE_KEYS]
+
+
+def _column_profiles(surfaces):
+    """
+    Pour chaque surface : première ligne opaque et dernière ligne opaque + 1 de chacune de
+    ses colonnes (hauteur de la surface et 0 pour une colonne vide). Deux tableaux (n, TILE_WIDTH).
+    """
+    tops = np.full((len(surfaces), TILE_WIDTH), TILE_HEIGHT, dtype=np.int32)
+    bottoms = np.zeros((len(surfaces), TILE_WIDTH), dtype=np.int32)
+    for i, surf in enumerate(surfaces):
+        if surf is None:
+            continue
+        opaque = pygame.surfarray.array_alpha(surf)[:TILE_WIDTH] > 0
+        filled = opaque.any(axis=1)
+        height = opaque.shape[1]
+        tops[i, :len(filled)] = np.where(filled, opaque.argmax(axis=1), height)
+        bottoms[i, :len(filled)] = np.where(filled, height - opaque[:, ::-1].argmax(axis=1), 0)
+    return tops, bottoms
+
+
+class TerrainAtlas(TerrainLayer):
+    """
+    Image isométrique de toute la carte (une par frame de l'eau), tenue à jour par les
+    TerrainEvent. La vue principale en est un sous-rectangle : déplacer la caméra ne
+    redessine aucune tuile. Coûteux en mémoire (4 octets par pixel, deux images) :
+    réservé aux cartes jusqu'à TERRAIN_ATLAS_MAX_TILES tuiles.
+    Le sous-rectangle est découpé à la silhouette de la vue, puis les tuiles des bords avant
+    (2 x view_size - 1) sont redessinées par-dessus : dans l'atlas, le relief situé devant la
+    vue les recouvre. Ces deux étapes ne sont refaites qu'après un déplacement de caméra ou
+    un changement de terrain.
+    Seules les caméras sur des tuiles entières (celles de Camera) sont tirées de l'atlas :
+    ailleurs, world_to_screen tronque chaque position et la vue n'est plus une translation
+    de l'atlas. Une caméra non entière est rendue par une TerrainLayer de la vue.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._mask = None  # silhouette de la vue : blanc opaque dedans, transparent dehors
+        self._mask_key = None
+        self._front = None  # tuiles des bords avant de la vue, sur fond transparent
+        # Vue composée par frame de l'eau, réutilisée tant que caméra et terrain ne changent pas
+        self._views = [None, None]
+        self._view_key = None
+        self._profiles = None  # (tops, bottoms) des colonnes de terrain, puis des rochers
+        self._view_layer = None  # TerrainLayer des caméras non entières, créée au besoin
+
+    def _cache_key(self, game_map, cam_r, cam_c):
+        # Tout est rendu une fois pour toutes : seuls les TerrainEvent redessinent
+        return game_map.grid_height, game_map.grid_width
+
+    def _layout(self, game_map, cam_r, cam_c):
+        height, width = game_map.grid_height, game_map.grid_width
+        return (0, 0), (0, height, 0, width), self.tiles_rect(game_map, 0, height, 0, width, 0, 0)
+
+    def detach(self):
+        super().detach()
+        if self._view_layer is not None:
+            self._view_layer.detach()
+
+    def image(self, game_map):
+        """Image de toute la carte à jour (frame de l'eau courante), pour captures et outils."""
+        self.refresh(game_map)
+        return self._surfaces[game_map.water_frame]
+
+    def _view_mask(self, game_map, rect, cam_r, cam_c):
+        """
+        Silhouette de la vue, calculée colonne par colonne sans dessiner de tuile : chaque
+        colonne de pixels est couverte sans trou entre le plus haut pixel d'une tile (ou
+        d'un rocher) et le bas de la plus basse face latérale.
+        """
+        key = (cam_r, cam_c, rect.size, self._patch_count)
+        if key == self._mask_key:
+            return self._mask
+        self._mask_key = key
+        if self._profiles is None:
+            columns = [game_map.column_surfaces.get((key, n_copies))
+                       for key in TERRAIN_TILE_KEYS for n_copies in range(ALTITUDE_MAX + 1)]
+            rocks = [game_map.tile_surfaces.get(key) for key in ROCK_TILE_KEYS]
+            self._profiles = _column_profiles(columns), _column_profiles(rocks)
+        (column_tops, column_bottoms), (rock_tops, rock_bottoms) = self._profiles
+
+        start_r, end_r, start_c, end_c = game_map.get_visible_bounds(cam_r, cam_c)
+        ids = game_map.classify_tiles(start_r, end_r, start_c, end_c)
+        corners = game_map.corners[start_r:end_r + 1, start_c:end_c + 1].astype(np.int32)
+        min_alt = np.minimum(np.minimum(corners[:-1, :-1], corners[:-1, 1:]),
+                             np.minimum(corners[1:, :-1], corners[1:, 1:]))
+        rows = np.arange(start_r, end_r)[:, None]
+        cols = np.arange(start_c, end_c)[None, :]
+        x0, y0 = game_map.world_to_screen(0, 0, 0, cam_r, cam_c)
+        # Mêmes positions que draw_tile, dans le repère du masque
+        ground_y = y0 - rect.y + (cols + rows) * TILE_HALF_H
+        blit_x = x0 - rect.x + (cols - rows) * TILE_HALF_W - TILE_HALF_W
+        raised = np.isin(ids, RAISED_TILE_IDS)
+        blit_y = ground_y - min_alt * TILE_HALF_H + raised * TILE_HALF_H
+        # Colonne de draw_tile : la tile posée sur ses copies de TILE_FLAT jusqu'au niveau 0
+        copies = np.maximum((ground_y - blit_y) // TILE_HALF_H, 0)
+        columns = ids.astype(np.intp) * (ALTITUDE_MAX + 1) + copies
+        tops = blit_y[..., None] + column_tops[columns]
+        bottoms = blit_y[..., None] + column_bottoms[columns]
+        rocks = game_map.rock_layer[start_r:end_r, start_c:end_c].astype(np.intp)
+        if rocks.any():
+            rock_y = (blit_y - raised * TILE_HALF_H)[..., None]
+            has_rock = (rocks > 0)[..., None]
+            tops = np.where(has_rock, np.minimum(tops, rock_y + rock_tops[rocks - 1]), tops)
+            bottoms = np.where(has_rock, np.maximum(bottoms, rock_y + rock_bottoms[rocks - 1]), bottoms)
+
+        width, height = rect.size
+        top = np.full(width, height, dtype=np.int32)
+        bottom = np.zeros(width, dtype=np.int32)
+        rows, cols = ids.shape
+        for diag in range(1 - rows, cols):
+            # Diagonale c - r constante : les tuiles occupent les mêmes colonnes écran
+            i = max(0, -diag)
+            x = blit_x.item(i, i + diag)
+            # Bornée au masque : une caméra non entière peut décaler la diagonale d'un pixel au-delà
+            lo, hi = max(x, 0), min(x + TILE_WIDTH, width)
+            if lo >= hi:
+                continue
+            span = slice(lo, hi)
+            part = slice(lo - x, hi - x)
+            np.minimum(top[span], np.diagonal(tops, diag).min(axis=-1)[part], out=top[span])
+            np.maximum(bottom[span], np.diagonal(bottoms, diag).max(axis=-1)[part], out=bottom[span])
+        y = np.arange(height)
+        if self._mask is None or self._mask.get_size() != rect.size:
+            self._mask = pygame.Surface(rect.size, pygame.SRCALPHA)
+            self._mask.fill((255, 255, 255, 0))
+        alpha = pygame.surfarray.pixels_alpha(self._mask)
+        alpha[...] = ((y >= top[:, None]) & (y < bottom[:, None])) * 255
+        del alpha
+        return self._mask
+
+    def _front_edges(self, game_map, rect, cam_r, cam_c, frame):
+        """Dernière ligne et dernière colonne de la vue, dessinées comme par TerrainLayer."""
+        if self._front is None or self._front.get_size() != rect.size:
+            self._front = pygame.Surface(rect.size, pygame.SRCALPHA)
+        self._front.fill(self.TRANSPARENT)
+        start_r, end_r, start_c, end_c = game_map.get_visible_bounds(cam_r, cam_c)
+        tile_ids = game_map.classify_tiles(start_r, end_r, start_c, end_c)
+        # Ordre du peintre : la dernière colonne ligne par ligne, puis la dernière ligne
+        edges = [(r, end_c - 1) for r in range(start_r, end_r - 1)]
+        edges += [(end_r - 1, c) for c in range(start_c, end_c)]
+        batch = RenderBatch(self._front)
+        for r, c in edges:
+            tile_key = _frame_key(TERRAIN_TILE_KEYS[tile_ids.item(r - start_r, c - start_c)], frame)
+            game_map.draw_tile(batch, r, c, cam_r, cam_c, offset_y=-rect.y, tile_key=tile_key, offset_x=-rect.x)
+        batch.flush()
+        return self._front
+
+    def draw(self, surface, game_map, cam_r, cam_c, offset_y=0):
+        if cam_r != int(cam_r) or cam_c != int(cam_c):
+            if self._view_layer is None:
+                self._view_layer = TerrainLayer()
+            self._view_layer.draw(surface, game_map, cam_r, cam_c, offset_y)
+            return
+        self.refresh(game_map)
+        rect = self.view_rect(game_map, cam_r, cam_c)
+        # Compteur de l'atlas plutôt que terrain_version : seul un rendu change l'image
+        key = (cam_r, cam_c, rect.size, self._patch_count)
+        if key != self._view_key:
+            self._view_key = key
+            self._views = [None, None]
+        frame = game_map.water_frame
+        if self._views[frame] is None:
+            # Position dans l'atlas (rendu avec la caméra en (0, 0)) du rectangle de la vue
+            x0, y0 = game_map.world_to_screen(0, 0, 0)
+            x1, y1 = game_map.world_to_screen(0, 0, 0, cam_r, cam_c)
+            area = rect.move(x0 - x1 - self._origin[0], y0 - y1 - self._origin[1])
+            # Masque x atlas : les alphas (0 ou 255) découpent la vue sans toucher aux couleurs
+            view = self._view_mask(game_map, rect, cam_r, cam_c).copy()
+            view.blit(self._surfaces[frame], (0, 0), area, special_flags=pygame.BLEND_RGBA_MULT)
+            view.blit(self._front_edges(game_map, rect, cam_r, cam_c, frame), (0, 0))
+            self._views[frame] = view
+        surface.blit(self._views[frame], (rect.x, rect.y + offset_y))
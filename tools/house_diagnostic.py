@@ -45,7 +45,7 @@ class PositioningTest:
         """Créer le terrain plat nécessaire et instancie bâtiment et peep pour tester l'alignement"""
         # Terrain naturel de base (altitude 1)
         self.game_map.set_all_altitude(1)
-        self.game_map.houses.clear()
+        self.game_map.clear_houses()
 
         # On choisit un point d'ancrage
         h_r, h_c = 4, 4
@@ -55,10 +55,10 @@ class PositioningTest:
         required_score = thresholds[self.selected_idx]
         
         # La plateforme centrale (bâtiment) est toujours construite
-        self.game_map.corners[h_r][h_c] = 2
-        self.game_map.corners[h_r][h_c+1] = 2
-        self.game_map.corners[h_r+1][h_c+1] = 2
-        self.game_map.corners[h_r+1][h_c] = 2
+        self.game_map.set_corner_altitude(h_r, h_c, 2)
+        self.game_map.set_corner_altitude(h_r, h_c+1, 2)
+        self.game_map.set_corner_altitude(h_r+1, h_c+1, 2)
+        self.game_map.set_corner_altitude(h_r+1, h_c, 2)
 
         # Définition de la matrice d'influence 5x5 pour le diagnostic
         influence_offsets = []
@@ -83,19 +83,19 @@ class PositioningTest:
             all_offsets = [(dr, dc) for dr in range(-2, 3) for dc in range(-2, 3) if not (dr == 0 and dc == 0)]
             for dr, dc in all_offsets:
                 tr, tc = h_r + dr, h_c + dc
-                self.game_map.corners[tr][tc] = 2
-                self.game_map.corners[tr][tc+1] = 2
-                self.game_map.corners[tr+1][tc+1] = 2
-                self.game_map.corners[tr+1][tc] = 2
+                self.game_map.set_corner_altitude(tr, tc, 2)
+                self.game_map.set_corner_altitude(tr, tc+1, 2)
+                self.game_map.set_corner_altitude(tr+1, tc+1, 2)
+                self.game_map.set_corner_altitude(tr+1, tc, 2)
         else:
             for i in range(min(len(influence_offsets), required_score)):
                 dr, dc = influence_offsets[i]
                 tr = h_r + dr
                 tc = h_c + dc
-                self.game_map.corners[tr][tc] = 2
-                self.game_map.corners[tr][tc+1] = 2
-                self.game_map.corners[tr+1][tc+1] = 2
-                self.game_map.corners[tr+1][tc] = 2
+                self.game_map.set_corner_altitude(tr, tc, 2)
+                self.game_map.set_corner_altitude(tr, tc+1, 2)
+                self.game_map.set_corner_altitude(tr+1, tc+1, 2)
+                self.game_map.set_corner_altitude(tr+1, tc, 2)
 
         # Ajout du bâtiment
         house = House(h_r, h_c)
@@ -104,7 +104,7 @@ class PositioningTest:
         house.life = thresholds[self.selected_idx] * 15.0 if self.selected_idx > 0 else 10.0
         house.update(0.1, self.game_map)
         house.building_type = self.buildings[self.selected_idx]
-        self.game_map.houses.append(house)
+        self.game_map.add_house(house)
 
         # On simule un peep sur ou juste devant le bâtiment
         self.peep = Peep(h_r, h_c, self.game_map)
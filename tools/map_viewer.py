@@ -6,6 +6,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from game_map import GameMap
+from terrain_layer import TerrainAtlas
 import settings
 
 # Dimensions par défaut pour la fenêtre graphique
@@ -43,6 +44,8 @@ def main():
 
     current_size = 8
     current_map = create_map(current_size)
+    # Image de toute la carte, reconstruite seulement quand le terrain ou l'eau changent
+    atlas = TerrainAtlas()
 
     running = True
     while running:
@@ -63,16 +66,9 @@ def main():
         # Rendu strict en 1:1
         screen.fill((0, 0, 0))
         
-        # Affichage classique isométrique
-        for r in range(current_map.grid_height):
-            for c in range(current_map.grid_width):
-                tile_key = current_map.get_tile_key(r, c)
-                tile_surf = current_map.tile_surfaces.get(tile_key)
-                
-                if tile_surf:
-                    a = current_map.get_corner_altitude(r, c)
-                    px, py = current_map.world_to_screen(r, c, a)
-                    screen.blit(tile_surf, (px, py))
+        # Affichage isométrique de toute la carte, centrée dans la fenêtre
+        image = atlas.image(current_map)
+        screen.blit(image, image.get_rect(center=screen.get_rect().center))
 
         # Affichage des informations
         font = pygame.font.SysFont("consolas", 16)
@@ -0,0 +1,150 @@
+"""
+Benchmark du rendu du terrain de la vue principale, selon la taille de la vue.
+- direct : GameMap.draw (toutes les tuiles à chaque frame)
+- couche : TerrainLayer (frames statiques, puis une édition de terrain par frame)
+- atlas : TerrainAtlas (image de toute la carte) face à la couche, la caméra bougeant à chaque frame
+- relief : GameMap.draw sur une carte plate et sur une carte montagneuse, faces latérales
+  pré-composées (column_surfaces) vs l'ancien empilement de copies de TILE_FLAT
+- eau : TerrainLayer sur une vue de mer et une vue de terre, la frame de l'eau changeant
+  à chaque frame (pire cas de l'animation), puis la caméra bougeant à chaque frame
+Usage: python render_benchmark.py [taille de vue ...]   (défaut : 8 16 32)
+"""
+
+
+import sys
+import os
+import random
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from game_map import GameMap, TERRAIN_TILE_KEYS, RAISED_TILE_KEYS
+from settings import ALTITUDE_MAX, TILE_FLAT, TILE_HALF_W, TILE_HALF_H
+from terrain_layer import TerrainLayer, TerrainAtlas
+
+
+DEFAULT_VIEW_SIZES = [8, 16, 32]
+GRID_SIZE = 64
+FRAMES = 100
+SURFACE_SIZE = (1280, 1024)
+
+
+def time_frames(draw, frames=FRAMES):
+    start = time.perf_counter()
+    for i in range(frames):
+        draw(i)
+    return (time.perf_counter() - start) * 1000.0 / frames
+
+
+def stacked_draw_tile(game_map, surface, r, c, cam_r, cam_c, tile_key):
+    """Ancien GameMap.draw_tile : une copie de TILE_FLAT blittée par niveau de face latérale (référence)."""
+    min_alt = min(game_map.get_corner_altitude(r, c), game_map.get_corner_altitude(r, c + 1),
+                  game_map.get_corner_altitude(r + 1, c + 1), game_map.get_corner_altitude(r + 1, c))
+    tile_surf = game_map.tile_surfaces.get(tile_key)
+    sx, sy = game_map.world_to_screen(r, c, min_alt, cam_r, cam_c)
+    blit_x = sx - TILE_HALF_W
+    blit_y = sy + TILE_HALF_H if tile_key in RAISED_TILE_KEYS else sy
+    _, sy0 = game_map.world_to_screen(r, c, 0, cam_r, cam_c)
+    n_copies = (sy0 - blit_y) // TILE_HALF_H
+    if n_copies > 0:
+        flat_surf = game_map.tile_surfaces.get(TILE_FLAT)
+        for k in range(n_copies, 0, -1):
+            surface.blit(flat_surf, (blit_x, blit_y + k * TILE_HALF_H))
+    surface.blit(tile_surf, (blit_x, blit_y))
+    rock = game_map.get_rock(r, c)
+    if rock:
+        rock_blit_y = blit_y - TILE_HALF_H if tile_key in RAISED_TILE_KEYS else blit_y
+        surface.blit(game_map.tile_surfaces.get(rock), (blit_x, rock_blit_y))
+
+
+def stacked_draw(game_map, surface, cam_r, cam_c):
+    """GameMap.draw avec l'ancien draw_tile (référence)."""
+    start_r, end_r, start_c, end_c = game_map.get_visible_bounds(cam_r, cam_c)
+    tile_ids = game_map.classify_tiles(start_r, end_r, start_c, end_c).tolist()
+    for r in range(start_r, end_r):
+        for c in range(start_c, end_c):
+            tile_key = TERRAIN_TILE_KEYS[tile_ids[r - start_r][c - start_c]]
+            stacked_draw_tile(game_map, surface, r, c, cam_r, cam_c, tile_key)
+
+
+def bench_relief(view_size):
+    surface = pygame.Surface(SURFACE_SIZE)
+    cam = (GRID_SIZE - view_size) // 2
+    for name, altitude in (("plate", 1), ("montagneuse", ALTITUDE_MAX)):
+        game_map = GameMap(GRID_SIZE, GRID_SIZE, view_size)
+        game_map.set_all_altitude(altitude)
+        # Quelques creux pour avoir des pentes, le reste des faces latérales restant haut
+        for r in range(cam, cam + view_size, 4):
+            for c in range(cam, cam + view_size, 4):
+                game_map.lower_corner(r, c)
+        column_ms = time_frames(lambda i: game_map.draw(surface, cam, cam))
+        stacked_ms = time_frames(lambda i: stacked_draw(game_map, surface, cam, cam))
+        print(f"vue {view_size}x{view_size}, carte {name}: colonnes {column_ms:.2f} ms, "
+              f"copies empilées {stacked_ms:.2f} ms")
+
+
+def bench_water(view_size):
+    surface = pygame.Surface(SURFACE_SIZE)
+    cam = (GRID_SIZE - view_size) // 2
+    cams = [(cam + i % 2, cam) for i in range(FRAMES)]
+    for name, altitude in (("mer", 0), ("terre", 1)):
+        game_map = GameMap(GRID_SIZE, GRID_SIZE, view_size)
+        game_map.set_all_altitude(altitude)
+        layer = TerrainLayer()
+        layer.draw(surface, game_map, cam, cam)
+
+        def animate(i):
+            game_map.water_frame = i % 2
+            layer.draw(surface, game_map, cam, cam)
+        animate_ms = time_frames(animate)
+        scroll_ms = time_frames(lambda i: layer.draw(surface, game_map, *cams[i]))
+        print(f"vue {view_size}x{view_size}, {name}: eau animée {animate_ms:.3f} ms, scrolling {scroll_ms:.2f} ms")
+
+
+def bench_view(view_size):
+    random.seed(view_size)
+    game_map = GameMap(GRID_SIZE, GRID_SIZE, view_size)
+    game_map.randomize()
+    surface = pygame.Surface(SURFACE_SIZE)
+    cam = (GRID_SIZE - view_size) // 2
+    layer = TerrainLayer()
+
+    direct_ms = time_frames(lambda i: game_map.draw(surface, cam, cam))
+    layer.draw(surface, game_map, cam, cam)
+    static_ms = time_frames(lambda i: layer.draw(surface, game_map, cam, cam))
+
+    def edit_and_draw(i):
+        r = cam + random.randint(0, view_size)
+        c = cam + random.randint(0, view_size)
+        (game_map.raise_corner if i % 2 else game_map.lower_corner)(r, c)
+        layer.draw(surface, game_map, cam, cam)
+    edit_ms = time_frames(edit_and_draw)
+
+    print(f"vue {view_size}x{view_size}: direct {direct_ms:.2f} ms, couche statique {static_ms:.3f} ms, "
+          f"couche + 1 édition {edit_ms:.2f} ms")
+
+    # Scrolling : une position de caméra différente à chaque frame
+    cams = [(random.randint(0, GRID_SIZE - view_size), random.randint(0, GRID_SIZE - view_size)) for _ in range(FRAMES)]
+    scroll_ms = time_frames(lambda i: layer.draw(surface, game_map, *cams[i]))
+    atlas = TerrainAtlas()
+    start = time.perf_counter()
+    atlas.draw(surface, game_map, cam, cam)
+    build_ms = (time.perf_counter() - start) * 1000.0
+    atlas_static_ms = time_frames(lambda i: atlas.draw(surface, game_map, cam, cam))
+    atlas_scroll_ms = time_frames(lambda i: atlas.draw(surface, game_map, *cams[i]))
+    print(f"vue {view_size}x{view_size}: scrolling couche {scroll_ms:.2f} ms, atlas {atlas_scroll_ms:.2f} ms "
+          f"(statique {atlas_static_ms:.3f} ms, construction {build_ms:.0f} ms)")
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    for view_size in [int(a) for a in sys.argv[1:]] or DEFAULT_VIEW_SIZES:
+        bench_view(view_size)
+        bench_relief(view_size)
+        bench_water(view_size)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
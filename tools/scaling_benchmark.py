@@ -0,0 +1,58 @@
+"""
+Benchmark du coût d'un tick (Game.update) et d'une frame (Game.draw) selon la taille du monde.
+Usage: python scaling_benchmark.py [taille ...]   (défaut : 64 128 256 512)
+"""
+
+
+import sys
+import os
+import io
+import random
+import time
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+from populous import Game
+
+
+DEFAULT_SIZES = [64, 128, 256, 512]
+PEEPS = 40
+WARMUP_TICKS = 10
+TICKS = 200
+DT = 1 / 30
+
+
+def bench_size(size):
+    random.seed(size)
+    # Le jeu est bavard (print à chaque action de l'IA) : sortie ignorée pendant la mesure
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        game = Game(size, size)
+        game.spawn_initial_peeps(PEEPS)
+        setup_ms = (time.perf_counter() - start) * 1000.0
+        for _ in range(WARMUP_TICKS):
+            game.update(DT)
+            game.draw()
+        tick_s = frame_s = 0.0
+        for _ in range(TICKS):
+            start = time.perf_counter()
+            game.update(DT)
+            tick_s += time.perf_counter() - start
+            start = time.perf_counter()
+            game.draw()
+            frame_s += time.perf_counter() - start
+    print(f"{size}x{size}: création {setup_ms:.0f} ms, tick {tick_s * 1000.0 / TICKS:.2f} ms, "
+          f"frame {frame_s * 1000.0 / TICKS:.2f} ms ({len(game.peeps)} peeps, {len(game.game_map.houses)} maisons)")
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        bench_size(size)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
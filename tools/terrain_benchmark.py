@@ -0,0 +1,217 @@
+"""
+Benchmark des opérations de terrain.
+- raise : propagation par pile explicite de GameMap (caches et événements compris) vs
+  l'ancienne version récursive sur une simple copie des coins en listes, et pinceau
+  multi-graines (apply_brush) vs raise_corner répétés.
+- smooth : lissage par chanfrein (chebyshev_envelope) vs les anciennes passes répétées.
+- chunks : coût d'un tick après des éditions éloignées (caches invalidés par chunk).
+- generate : générateur à clé (map_generator) vs GameMap.randomize.
+Usage: python terrain_benchmark.py [raise|smooth|chunks|generate] [taille ...]
+"""
+
+
+import sys
+import os
+import random
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+from game_map import GameMap, chebyshev_envelope
+from map_generator import generate_map
+from settings import ALTITUDE_MAX
+
+
+DEFAULT_SIZES = [64, 256, 512]
+RAISES_PER_SIZE = 200
+SMOOTH_SIZES = [64, 256, 1024]
+# Au-delà, l'ancien lissage (Python pur, passes répétées) devient trop long
+SMOOTH_REFERENCE_MAX = 1024
+CHUNK_SIZES = [256, 1024]
+GENERATE_SIZES = [64, 256, 512, 1024]
+# Au-delà, randomize (génération case par case) devient trop long
+RANDOMIZE_MAX = 512
+
+
+def recursive_raise(corners, r, c, visited=None):
+    """
+    Ancienne propagation récursive (référence), sur une copie des coins en listes :
+    aucun cache ni abonné à tenir à jour, seulement la propagation.
+    """
+    if visited is None:
+        visited = set()
+    if (r, c) in visited:
+        return
+    visited.add((r, c))
+    new_alt = corners[r][c] + 1
+    if new_alt > ALTITUDE_MAX:
+        return
+    corners[r][c] = new_alt
+    max_r, max_c = len(corners) - 1, len(corners[0]) - 1
+    for dr in [-1, 0, 1]:
+        for dc in [-1, 0, 1]:
+            if dr == 0 and dc == 0:
+                continue
+            nr, nc = r + dr, c + dc
+            if 0 <= nr <= max_r and 0 <= nc <= max_c:
+                if new_alt - corners[nr][nc] > 1:
+                    recursive_raise(corners, nr, nc, visited)
+
+
+def repeated_sweeps(corners):
+    """Ancien _enforce_height_constraints : passes complètes jusqu'à stabilité (référence)."""
+    max_r, max_c = len(corners) - 1, len(corners[0]) - 1
+    changed = True
+    while changed:
+        changed = False
+        for r in range(max_r + 1):
+            for c in range(max_c + 1):
+                for dr, dc in [(0,1),(0,-1),(1,0),(-1,0),(1,1),(1,-1),(-1,1),(-1,-1)]:
+                    nr, nc = r + dr, c + dc
+                    if 0 <= nr <= max_r and 0 <= nc <= max_c:
+                        if corners[r][c] - corners[nr][nc] > 1:
+                            corners[r][c] = corners[nr][nc] + 1
+                            changed = True
+    return corners
+
+
+def make_map(size, seed):
+    random.seed(seed)
+    game_map = GameMap(size, size)
+    game_map.randomize()
+    return game_map
+
+
+def time_raises(target, raise_fn, points):
+    """Temps moyen par raise (ms), ou None si la récursion déborde."""
+    start = time.perf_counter()
+    try:
+        for (r, c) in points:
+            raise_fn(target, r, c)
+    except RecursionError:
+        return None
+    return (time.perf_counter() - start) * 1000.0 / len(points)
+
+
+def bench_size(size):
+    rng = random.Random(size)
+    points = [(rng.randint(0, size), rng.randint(0, size)) for _ in range(RAISES_PER_SIZE)]
+
+    # Propagation seule, puis clic complet (rochers noyés compris)
+    iterative_map = make_map(size, size)
+    iterative_ms = time_raises(iterative_map, lambda m, r, c: m.propagate_raise(r, c), points)
+    click_map = make_map(size, size)
+    click_ms = time_raises(click_map, lambda m, r, c: m.raise_corner(r, c), points)
+
+    reference = make_map(size, size).corners.tolist()
+    recursive_ms = time_raises(reference, recursive_raise, points)
+
+    same = recursive_ms is not None and iterative_map.corners.tolist() == reference
+    recursive_txt = "RecursionError" if recursive_ms is None else f"{recursive_ms:.3f} ms"
+    print(f"{size}x{size}: récursif (listes) {recursive_txt}/raise, pile propagate_raise {iterative_ms:.3f} ms, "
+          f"raise_corner {click_ms:.3f} ms, identique: {same}")
+
+    # Multi-seed : une ligne entière de coins montée en une seule propagation
+    game_map = make_map(size, size)
+    row = [(size // 2, c) for c in range(size + 1)]
+    start = time.perf_counter()
+    changed = len(game_map.raise_corners(row))
+    elapsed = (time.perf_counter() - start) * 1000.0
+    print(f"{size}x{size}: raise d'une ligne ({len(row)} graines) -> {changed} coins en {elapsed:.1f} ms")
+
+    # Pinceau : +5 sur un coin (volcan) en une propagation vs 5 raise_corner successifs
+    repeated_map = make_map(size, size)
+    start = time.perf_counter()
+    for _ in range(5):
+        repeated_map.raise_corner(size // 2, size // 2)
+    repeated_ms = (time.perf_counter() - start) * 1000.0
+    brush_map = make_map(size, size)
+    start = time.perf_counter()
+    brush_map.apply_brush([(size // 2, size // 2)], [5])
+    brush_ms = (time.perf_counter() - start) * 1000.0
+    same = (repeated_map.corners == brush_map.corners).all()
+    print(f"{size}x{size}: +5 par pinceau {brush_ms:.2f} ms, 5 raise_corner {repeated_ms:.2f} ms, identique: {same}")
+
+
+def bench_smooth(size):
+    # Bruit uniforme 0..7 : le pire cas pour les passes répétées
+    noise = np.random.default_rng(size).integers(0, 8, (size + 1, size + 1), dtype=np.int8)
+
+    start = time.perf_counter()
+    result = chebyshev_envelope(noise)
+    chamfer_ms = (time.perf_counter() - start) * 1000.0
+
+    if size > SMOOTH_REFERENCE_MAX:
+        print(f"{size}x{size}: chanfrein {chamfer_ms:.1f} ms (référence ignorée)")
+        return
+    start = time.perf_counter()
+    reference = repeated_sweeps(noise.tolist())
+    reference_ms = (time.perf_counter() - start) * 1000.0
+    same = result.tolist() == reference
+    print(f"{size}x{size}: chanfrein {chamfer_ms:.1f} ms, passes répétées {reference_ms:.1f} ms, identique: {same}")
+
+
+def bench_chunks(size):
+    game_map = make_map(size, size)
+    game_map.get_tile_key(0, 0)
+    # Deux éditions aux coins opposés de la carte, puis une lecture de la vue
+    start = time.perf_counter()
+    for _ in range(10):
+        game_map.raise_corner(2, 2)
+        game_map.raise_corner(size - 2, size - 2)
+        game_map.classify_tiles(0, 8, 0, 8)
+        game_map.can_place_house_initial(4, 4)
+    elapsed = (time.perf_counter() - start) * 100.0
+    start = time.perf_counter()
+    game_map.do_flood()
+    game_map.classify_tiles(0, 8, 0, 8)
+    flood_ms = (time.perf_counter() - start) * 1000.0
+    print(f"{size}x{size} ({game_map.chunk_rows}x{game_map.chunk_cols} chunks): "
+          f"2 éditions + lecture {elapsed:.2f} ms, flood {flood_ms:.1f} ms")
+
+
+def bench_generate(size):
+    start = time.perf_counter()
+    generated = generate_map(size, size, key="BENCH")
+    generate_ms = (time.perf_counter() - start) * 1000.0
+    same = (generate_map(size, size, key="BENCH").corners == generated.corners).all()
+    if size > RANDOMIZE_MAX:
+        print(f"{size}x{size}: générateur {generate_ms:.1f} ms (randomize ignoré), reproductible: {same}")
+        return
+    game_map = GameMap(size, size)
+    start = time.perf_counter()
+    game_map.randomize()
+    randomize_ms = (time.perf_counter() - start) * 1000.0
+    print(f"{size}x{size}: générateur {generate_ms:.1f} ms, randomize {randomize_ms:.1f} ms, reproductible: {same}")
+
+
+def main():
+    args = sys.argv[1:]
+    mode = args.pop(0) if args and args[0] in ('raise', 'smooth', 'chunks', 'generate') else None
+    sizes = [int(a) for a in args]
+    if mode in (None, 'raise'):
+        pygame.init()
+        pygame.display.set_mode((1, 1))
+        for size in sizes or DEFAULT_SIZES:
+            bench_size(size)
+        pygame.quit()
+    if mode in (None, 'smooth'):
+        for size in sizes or SMOOTH_SIZES:
+            bench_smooth(size)
+    if mode in (None, 'chunks'):
+        pygame.init()
+        pygame.display.set_mode((1, 1))
+        for size in sizes or CHUNK_SIZES:
+            bench_chunks(size)
+        pygame.quit()
+    if mode in (None, 'generate'):
+        pygame.init()
+        pygame.display.set_mode((1, 1))
+        for size in sizes or GENERATE_SIZES:
+            bench_generate(size)
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main()